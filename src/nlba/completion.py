@@ -0,0 +1,236 @@
+from bisect import bisect_left, insort
+from heapq import nlargest
+
+from nlba.config_manager import get_history_file_path
+
+try:
+    import readline
+except ImportError:  # readline is not available on every platform (e.g. Windows)
+    readline = None
+
+# Requests offered before the history has anything better, following the project's filesystem focus.
+DEFAULT_PATTERNS = (
+    "list files in the current directory",
+    "list all python files recursively",
+    "show disk usage of this directory",
+    "find files larger than 100MB",
+    "count lines in every python file",
+    "search for TODO in all files",
+    "create directory",
+    "copy file to directory",
+    "move file to directory",
+    "remove file",
+)
+
+# Prefixes matching more entries than this keep their best completions cached;
+# smaller ranges are cheap enough to rank on every keystroke.
+_RANGE_SCAN_LIMIT = 256
+
+# The number of completions cached per prefix, and so the default completion limit.
+_CACHED_COMPLETIONS = 10
+
+# Loading more lines than this at once rebuilds the index instead of inserting one by one.
+_BULK_LOAD_THRESHOLD = 1000
+
+# '\U0010ffff' sorts after every character that can follow a prefix.
+_PREFIX_END = '\U0010ffff'
+
+
+class CompletionIndex:
+    """
+    In-memory prefix index over past requests, ranked by frequency and recency.
+
+    Entries are kept in a sorted array so that all completions for a prefix form a
+    contiguous slice that can be located with two bisections. Small slices are
+    ranked directly. Every prefix whose slice is larger than `_RANGE_SCAN_LIMIT`
+    (the upper levels of the implied trie) caches its best entries, so ranking
+    costs at most one bounded scan per keystroke whatever the history size. Adding
+    an entry only updates the caches of its own prefixes, because its score is the
+    only one that changes. The index is loaded incrementally from the history
+    file: each refresh only reads the lines appended since the previous one.
+    """
+
+    def __init__(self, history_file=None, patterns=None):
+        self.history_file = history_file or get_history_file_path()
+        self.patterns = list(patterns or ())
+        self._offset = 0
+        self._stats = {}  # entry -> [frequency, last_seen]
+        self._sequence = 0
+        self._sorted = []
+        self._top = {}  # prefix -> best entries, for prefixes matching more than _RANGE_SCAN_LIMIT entries
+        self._load(self.patterns)
+
+    def __len__(self):
+        return len(self._stats)
+
+    def add(self, entry: str):
+        """Records one occurrence of an entry."""
+        entry = entry.strip()
+        if not entry:
+            return
+        if entry not in self._stats:
+            insort(self._sorted, entry)
+        self._record(entry)
+        # Scores only grow, so an entry can enter or move up in its prefixes' caches but never
+        # displace anything else. Prefixes of a heavy prefix are heavy too, so the walk stops at
+        # the first prefix that is still small enough to rank directly.
+        for length in range(len(entry) + 1):
+            prefix = entry[:length]
+            top = self._top.get(prefix)
+            if top is None:
+                start, end = self._range(prefix)
+                if end - start <= _RANGE_SCAN_LIMIT:
+                    break
+                self._top[prefix] = nlargest(_CACHED_COMPLETIONS, self._sorted[start:end], key=self._score)
+                continue
+            if entry in top:
+                top.remove(entry)
+            top.append(entry)
+            top.sort(key=self._score, reverse=True)
+            del top[_CACHED_COMPLETIONS:]
+
+    def refresh(self):
+        """Loads the history lines appended since the last refresh."""
+        if not self.history_file.exists():
+            return
+        if self.history_file.stat().st_size < self._offset:
+            # The history file was truncated or replaced; start over from the seed patterns.
+            self._offset = 0
+            self._stats.clear()
+            self._sequence = 0
+            self._load(self.patterns)
+        with open(self.history_file, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read()
+        # Only consume complete lines so a concurrent writer is never half-read.
+        end = data.rfind(b'\n') + 1
+        self._load(data[:end].decode('utf-8', errors='replace').splitlines())
+        self._offset += end
+
+    def _load(self, entries: list[str]):
+        if len(entries) <= _BULK_LOAD_THRESHOLD and self._stats:
+            for entry in entries:
+                self.add(entry)
+            return
+        for entry in entries:
+            entry = entry.strip()
+            if entry:
+                self._record(entry)
+        self._rebuild()
+
+    def _record(self, entry: str):
+        self._sequence += 1
+        stats = self._stats.get(entry)
+        if stats is None:
+            stats = self._stats[entry] = [0, 0]
+        stats[0] += 1
+        stats[1] = self._sequence
+
+    def complete(self, prefix: str, limit: int = _CACHED_COMPLETIONS) -> list[str]:
+        """
+        Returns the best entries starting with the given prefix.
+
+        Args:
+            prefix: The text typed so far.
+            limit: The maximum number of completions to return.
+
+        Returns:
+            Matching entries, most frequent (then most recent) first.
+        """
+        start, end = self._range(prefix)
+        if end - start <= _RANGE_SCAN_LIMIT:
+            return nlargest(limit, self._sorted[start:end], key=self._score)
+        if limit > _CACHED_COMPLETIONS:
+            # More than the cache holds; rank the whole slice.
+            return nlargest(limit, self._sorted[start:end], key=self._score)
+        top = self._top.get(prefix)
+        if top is None:
+            top = self._top[prefix] = nlargest(_CACHED_COMPLETIONS, self._sorted[start:end], key=self._score)
+        return top[:limit]
+
+    def _range(self, prefix: str) -> tuple[int, int]:
+        start = bisect_left(self._sorted, prefix)
+        return start, bisect_left(self._sorted, prefix + _PREFIX_END, start)
+
+    def _score(self, entry: str):
+        frequency, last_seen = self._stats[entry]
+        return frequency, last_seen
+
+    def _rebuild(self):
+        self._sorted = sorted(self._stats)
+        self._top = {}
+        if len(self._sorted) <= _RANGE_SCAN_LIMIT:
+            return
+        # Post-order walk over the heavy prefixes. A prefix's cache is merged from its heavy
+        # children's caches and the entries of its small children, so every entry is ranked once.
+        stack = [('', 0, len(self._sorted), None)]
+        while stack:
+            prefix, start, end, children = stack.pop()
+            if children is None:
+                children = self._children(prefix, start, end)
+                stack.append((prefix, start, end, children))
+                stack.extend((child, child_start, child_end, None) for child, child_start, child_end in children
+                             if child_end - child_start > _RANGE_SCAN_LIMIT)
+                continue
+            candidates = [prefix] if self._sorted[start] == prefix else []
+            for child, child_start, child_end in children:
+                if child_end - child_start > _RANGE_SCAN_LIMIT:
+                    candidates.extend(self._top[child])
+                else:
+                    candidates.extend(self._sorted[child_start:child_end])
+            self._top[prefix] = nlargest(_CACHED_COMPLETIONS, candidates, key=self._score)
+
+    def _children(self, prefix: str, start: int, end: int) -> list[tuple[str, int, int]]:
+        """Splits the slice of a prefix by the character that follows it."""
+        children = []
+        position = start + 1 if self._sorted[start] == prefix else start
+        while position < end:
+            child = self._sorted[position][:len(prefix) + 1]
+            child_end = bisect_left(self._sorted, child + _PREFIX_END, position, end)
+            children.append((child, position, child_end))
+            position = child_end
+        return children
+
+
+def install_completer(index: CompletionIndex, prompt: str = "> ") -> bool:
+    """
+    Hooks the index into readline so that TAB completes the whole input line.
+
+    A single match is completed inline. When several requests match, the first TAB
+    extends the line to their common prefix and lists them as suggestions below
+    the prompt, best first, instead of in readline's alphabetical order.
+
+    Args:
+        index: The index to complete from.
+        prompt: The prompt to redraw after the suggestions are listed.
+
+    Returns:
+        True if readline is available and the completer was installed.
+    """
+    if readline is None:
+        return False
+
+    matches = []
+
+    def completer(text, state):
+        if state == 0:
+            index.refresh()
+            matches[:] = index.complete(text)
+        return matches[state] if state < len(matches) else None
+
+    def display_suggestions(substitution, _, longest_match_length):
+        print()
+        for match in matches:
+            print(f"  {match}")
+        print(prompt + readline.get_line_buffer(), end='', flush=True)
+
+    readline.set_completer(completer)
+    readline.set_completion_display_matches_hook(display_suggestions)
+    # Requests contain spaces, so complete the entire line rather than single words.
+    readline.set_completer_delims('')
+    if 'libedit' in (readline.__doc__ or ''):
+        readline.parse_and_bind("bind ^I rl_complete")
+    else:
+        readline.parse_and_bind("tab: complete")
+        readline.parse_and_bind("set show-all-if-ambiguous on")
+    return True
@@ -1,8 +1,10 @@
+import json
 import yaml
 from pathlib import Path
 
 CONFIG_DIR = Path.home() / ".config" / "nlba"
 HISTORY_FILE = CONFIG_DIR / "history.log"
+JOURNAL_FILE = CONFIG_DIR / "journal.jsonl"
 GLOBAL_CONFIG_FILE = CONFIG_DIR / "config.yaml"
 LOCAL_CONFIG_FILE = Path("./.nlba/config.yaml")
 
@@ -23,6 +25,24 @@ def get_history_entry(index: int):
             return lines[index - 1].strip()
     return None
 
+def log_outcome(request: str, command: str, exit_code: int):
+    JOURNAL_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(JOURNAL_FILE, 'a') as f:
+        f.write(json.dumps({'request': request, 'command': command, 'exit_code': exit_code}) + '\n')
+
+def load_journal(limit: int = 1000):
+    """Returns the most recent journal entries, oldest first."""
+    if not JOURNAL_FILE.exists():
+        return []
+    entries = []
+    with open(JOURNAL_FILE, 'r') as f:
+        for line in f.readlines()[-limit:]:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return entries
+
 
 def load_config():
     config = {'nlba': {'provider': 'mock', 'summarize': False}}
@@ -1,5 +1,11 @@
 import os
+import re
+import threading
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+from nlba.plan import PlanStep, parse_plan
+from nlba.rate_limiter import RateLimitExceeded
 
 PROMPT_TEMPLATE = (
     "Convert the following natural language request into a single, executable bash command. "
@@ -8,6 +14,16 @@ PROMPT_TEMPLATE = (
     "Do not include any explanations or additional text.\n\nRequest: {request}\nCommand:"
 )
 
+PLAN_PROMPT_TEMPLATE = (
+    "Break the following natural language request into a small plan of executable bash commands. "
+    "Steps that do not depend on each other will run in parallel. "
+    "Format the response as JSON only:\n"
+    '{{"steps": [{{"id": "<short id>", "command": "<bash command>", '
+    '"depends_on": ["<ids of steps that must finish first>"], "destructive": <true or false>}}]}}\n'
+    "Set destructive to true for any step that modifies files or system state. "
+    "Do not include any explanations or additional text.\n\nRequest: {request}\nPlan:"
+)
+
 SUMMARY_PROMPT_TEMPLATE = (
     "Summarize the following command output in a single, user-friendly sentence. "
     "The original request was: '{request}'.\n\n"
@@ -16,9 +32,147 @@ SUMMARY_PROMPT_TEMPLATE = (
     "Summary:"
 )
 
+BATCH_SUMMARY_PROMPT_TEMPLATE = (
+    "Summarize the output of each of the following commands in a single, user-friendly sentence. "
+    "Format the response as one line per item:\nSUMMARY <number>: <summary>\n"
+    "Do not include any explanations or additional text.\n\n"
+    "{items}\n"
+    "Summaries:"
+)
+
+BATCH_SUMMARY_ITEM_TEMPLATE = (
+    "Item {number}:\n"
+    "The original request was: '{request}'.\n"
+    "Command: '{command}'\n"
+    "Output:\n{output}\n"
+)
+
+# Default prompt budget for a single batched summarization call.
+BATCH_TOKEN_BUDGET = 6000
+
+_BATCH_SUMMARY_LINE = re.compile(r"^\s*SUMMARY\s+(\d+)\s*:\s*(.*)$", re.IGNORECASE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimates the number of tokens in a text (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def build_batch_summary_prompt(items: list[tuple[str, str, str]]) -> str:
+    """Packs several (request, command, output) items into one summarization prompt."""
+    formatted = "\n".join(
+        BATCH_SUMMARY_ITEM_TEMPLATE.format(number=number, request=request, command=command, output=output)
+        for number, (request, command, output) in enumerate(items, 1)
+    )
+    return BATCH_SUMMARY_PROMPT_TEMPLATE.format(items=formatted)
+
+
+def parse_batch_summaries(response_text: str, count: int) -> list[str]:
+    """
+    Parses a batched summarization response.
+
+    Args:
+        response_text: The raw model response.
+        count: The number of items that were sent.
+
+    Returns:
+        One summary per item, in the original order.
+
+    Raises:
+        ValueError: If a summary is missing for any item.
+    """
+    summaries = {}
+    for line in response_text.splitlines():
+        match = _BATCH_SUMMARY_LINE.match(line)
+        if match:
+            summaries[int(match.group(1))] = match.group(2).strip()
+    missing = [number for number in range(1, count + 1) if not summaries.get(number)]
+    if missing:
+        raise ValueError(f"Missing summaries for items: {missing}")
+    return [summaries[number] for number in range(1, count + 1)]
+
+
+def split_into_batches(items: list[tuple[str, str, str]], token_budget: int = BATCH_TOKEN_BUDGET) -> list[list[tuple[str, str, str]]]:
+    """
+    Groups items into batches whose prompts stay within the token budget.
+
+    An item that exceeds the budget on its own is placed in a batch by itself.
+    """
+    overhead = estimate_tokens(BATCH_SUMMARY_PROMPT_TEMPLATE)
+    batches = []
+    current, current_tokens = [], overhead
+    for item in items:
+        request, command, output = item
+        item_tokens = estimate_tokens(
+            BATCH_SUMMARY_ITEM_TEMPLATE.format(number=len(current) + 1, request=request, command=command, output=output)
+        )
+        if current and current_tokens + item_tokens > token_budget:
+            batches.append(current)
+            current, current_tokens = [], overhead
+        current.append(item)
+        current_tokens += item_tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+GEMINI_MODEL = 'gemini-1.5-flash'
+OPENAI_MODEL = 'gpt-3.5-turbo'
+
+# Upper bound on the tokens a single completion may produce, used to reserve rate-limit capacity.
+MAX_OUTPUT_TOKENS = 100
+MAX_PLAN_TOKENS = 600
+
+
+_speculative = threading.local()
+
+
+@contextmanager
+def speculative_calls():
+    """
+    Marks the provider calls made in this thread as speculative.
+
+    Speculative calls only use rate-limit capacity that is free right now; when the
+    limiter would queue them they raise RateLimitExceeded instead of taking quota
+    ahead of real requests.
+    """
+    previous = getattr(_speculative, 'active', False)
+    _speculative.active = True
+    try:
+        yield
+    finally:
+        _speculative.active = previous
+
+
+def is_speculative() -> bool:
+    """Returns whether the current thread is inside `speculative_calls()`."""
+    return getattr(_speculative, 'active', False)
+
+
 class BaseLLMProvider(ABC):
     """Abstract base class for LLM providers."""
 
+    rate_limiter = None
+
+    def _wait_for_capacity(self, prompt: str, max_output_tokens: int = MAX_OUTPUT_TOKENS) -> float:
+        """
+        Blocks until the configured rate limiter admits a call with the given prompt.
+
+        Raises:
+            RateLimitExceeded: If the call is speculative and the limiter has no free capacity.
+
+        Returns:
+            The number of seconds spent queued (0 when no limiter is configured).
+        """
+        if self.rate_limiter is None:
+            return 0.0
+        tokens = estimate_tokens(prompt) + max_output_tokens
+        if is_speculative():
+            if not self.rate_limiter.try_acquire(tokens):
+                raise RateLimitExceeded(f"No free capacity for a speculative call on {self.rate_limiter.key}")
+            return 0.0
+        return self.rate_limiter.acquire(tokens)
+
     @abstractmethod
     def generate_command(self, natural_language_request: str) -> tuple[str, str]:
         """
@@ -32,6 +186,22 @@ class BaseLLMProvider(ABC):
         """
         return "ls -l", "non-destructive"
 
+    def generate_plan(self, natural_language_request: str) -> list[PlanStep]:
+        """
+        Generates a multi-step plan whose steps declare their dependencies.
+
+        Providers that cannot plan, or whose plan response cannot be parsed, return a
+        single step built from `generate_command`.
+
+        Args:
+            natural_language_request: The user's request in natural language.
+
+        Returns:
+            The validated plan steps.
+        """
+        command, classification = self.generate_command(natural_language_request)
+        return [PlanStep("1", command, [], classification.lower() == "destructive")]
+
     @abstractmethod
     def summarize_output(self, request: str, command: str, output: str) -> str:
         """
@@ -47,6 +217,43 @@ class BaseLLMProvider(ABC):
         """
         return f"The command '{command}' was executed."
 
+    def summarize_outputs(self, items: list[tuple[str, str, str]], token_budget: int = BATCH_TOKEN_BUDGET) -> list[str]:
+        """
+        Summarizes the outputs of several commands using as few calls as possible.
+
+        Items are packed into prompts that fit the token budget. If a batched
+        response cannot be parsed, the items of that batch are summarized one by one.
+
+        Args:
+            items: A list of (request, command, output) tuples.
+            token_budget: The maximum estimated prompt size of a single call.
+
+        Returns:
+            A summary for each item, in the original order.
+        """
+        summaries = []
+        for batch in split_into_batches(items, token_budget):
+            if len(batch) > 1:
+                try:
+                    summaries.extend(self._summarize_batch(batch))
+                    continue
+                except ValueError:
+                    pass
+            summaries.extend(self.summarize_output(*item) for item in batch)
+        return summaries
+
+    def _summarize_batch(self, batch: list[tuple[str, str, str]]) -> list[str]:
+        """
+        Summarizes a batch of items in a single provider call.
+
+        Providers that cannot batch keep this default, which raises so that
+        `summarize_outputs` falls back to per-item calls.
+
+        Raises:
+            ValueError: If the batch could not be summarized in one call.
+        """
+        raise ValueError(f"{type(self).__name__} does not support batched summarization")
+
 
 class MockLLMProvider(BaseLLMProvider):
     """A mock LLM provider for testing and development."""
@@ -66,17 +273,42 @@ class MockLLMProvider(BaseLLMProvider):
         else:
             return f"echo 'Mock command for: {natural_language_request}'", "non-destructive"
 
+    def generate_plan(self, natural_language_request: str) -> list[PlanStep]:
+        """
+        Generates a mock plan: parts joined by " and " are independent steps, and each
+        part after " then " depends on every step before it.
+        """
+        steps = []
+        previous_ids = []
+        for stage in natural_language_request.split(" then "):
+            stage_ids = []
+            for part in stage.split(" and "):
+                command, classification = self.generate_command(part.strip())
+                step_id = str(len(steps) + 1)
+                steps.append(PlanStep(step_id, command, list(previous_ids), classification == "destructive"))
+                stage_ids.append(step_id)
+            previous_ids = stage_ids
+        return steps
+
     def summarize_output(self, request: str, command: str, output: str) -> str:
         return f"This is a mock summary for the command: '{command}'"
 
+    def _summarize_batch(self, batch: list[tuple[str, str, str]]) -> list[str]:
+        response_text = "\n".join(
+            f"SUMMARY {number}: {self.summarize_output(*item)}" for number, item in enumerate(batch, 1)
+        )
+        return parse_batch_summaries(response_text, len(batch))
+
 
 class GeminiLLMProvider(BaseLLMProvider):
     """LLM provider using Google Gemini API."""
 
-    def __init__(self):
+    def __init__(self, model: str = GEMINI_MODEL, rate_limiter=None):
+        self.model_name = model
+        self.rate_limiter = rate_limiter
         try:
             import google.generativeai as genai
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
+            self.model = genai.GenerativeModel(self.model_name)
             genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
         except ImportError:
             raise ImportError("google-generativeai not installed. Please install it with 'pip install google-generativeai'")
@@ -85,6 +317,7 @@ class GeminiLLMProvider(BaseLLMProvider):
 
     def generate_command(self, natural_language_request: str) -> tuple[str, str]:
         prompt = PROMPT_TEMPLATE.format(request=natural_language_request)
+        self._wait_for_capacity(prompt)
         try:
             response = self.model.generate_content(prompt)
             response_text = response.text.strip()
@@ -100,19 +333,46 @@ class GeminiLLMProvider(BaseLLMProvider):
         except Exception as e:
             raise RuntimeError(f"Gemini API call failed: {e}")
 
+    def generate_plan(self, natural_language_request: str) -> list[PlanStep]:
+        prompt = PLAN_PROMPT_TEMPLATE.format(request=natural_language_request)
+        self._wait_for_capacity(prompt, MAX_PLAN_TOKENS)
+        try:
+            response = self.model.generate_content(prompt)
+            response_text = response.text.strip()
+        except Exception as e:
+            raise RuntimeError(f"Gemini API call failed: {e}")
+        try:
+            return parse_plan(response_text)
+        except ValueError:
+            # Models often return malformed plans; fall back to a single-command plan.
+            return super().generate_plan(natural_language_request)
+
     def summarize_output(self, request: str, command: str, output: str) -> str:
         prompt = SUMMARY_PROMPT_TEMPLATE.format(request=request, command=command, output=output)
+        self._wait_for_capacity(prompt)
         try:
             response = self.model.generate_content(prompt)
             return response.text.strip()
         except Exception as e:
             raise RuntimeError(f"Gemini API call failed: {e}")
 
+    def _summarize_batch(self, batch: list[tuple[str, str, str]]) -> list[str]:
+        prompt = build_batch_summary_prompt(batch)
+        self._wait_for_capacity(prompt, MAX_OUTPUT_TOKENS * len(batch))
+        try:
+            response = self.model.generate_content(prompt)
+            response_text = response.text.strip()
+        except Exception as e:
+            raise RuntimeError(f"Gemini API call failed: {e}")
+        return parse_batch_summaries(response_text, len(batch))
+
 
 class OpenAILLMProvider(BaseLLMProvider):
     """LLM provider using OpenAI API."""
 
-    def __init__(self):
+    def __init__(self, model: str = OPENAI_MODEL, rate_limiter=None):
+        self.model_name = model
+        self.rate_limiter = rate_limiter
         try:
             from openai import OpenAI
             self.client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
@@ -123,18 +383,18 @@ class OpenAILLMProvider(BaseLLMProvider):
 
     def generate_command(self, natural_language_request: str) -> tuple[str, str]:
         prompt = PROMPT_TEMPLATE.format(request=natural_language_request)
+        self._wait_for_capacity(prompt)
         try:
             response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
+                model=self.model_name,
                 messages=[
                     {"role": "system", "content": "You are a helpful assistant that converts natural language requests into bash commands."},
                     {"role": "user", "content": prompt}
                 ],
-                max_tokens=100,
+                max_tokens=MAX_OUTPUT_TOKENS,
                 temperature=0.1,
             )
             response_text = response.choices[0].message.content.strip()
-            print(f"OpenAI response: {response_text}")
             lines = response_text.splitlines()
             if len(lines) >= 2:
                 command = lines[0]
@@ -146,18 +406,59 @@ class OpenAILLMProvider(BaseLLMProvider):
         except Exception as e:
             raise RuntimeError(f"OpenAI API call failed: {e}")
 
+    def generate_plan(self, natural_language_request: str) -> list[PlanStep]:
+        prompt = PLAN_PROMPT_TEMPLATE.format(request=natural_language_request)
+        self._wait_for_capacity(prompt, MAX_PLAN_TOKENS)
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model_name,
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant that plans bash commands for natural language requests."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=MAX_PLAN_TOKENS,
+                temperature=0.1,
+            )
+            response_text = response.choices[0].message.content.strip()
+        except Exception as e:
+            raise RuntimeError(f"OpenAI API call failed: {e}")
+        try:
+            return parse_plan(response_text)
+        except ValueError:
+            # Models often return malformed plans; fall back to a single-command plan.
+            return super().generate_plan(natural_language_request)
+
     def summarize_output(self, request: str, command: str, output: str) -> str:
         prompt = SUMMARY_PROMPT_TEMPLATE.format(request=request, command=command, output=output)
+        self._wait_for_capacity(prompt)
         try:
             response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
+                model=self.model_name,
                 messages=[
                     {"role": "system", "content": "You are a helpful assistant that summarizes command outputs."},
                     {"role": "user", "content": prompt}
                 ],
-                max_tokens=100,
+                max_tokens=MAX_OUTPUT_TOKENS,
                 temperature=0.1,
             )
             return response.choices[0].message.content.strip()
         except Exception as e:
-            raise RuntimeError(f"OpenAI API call failed: {e}")
\ No newline at end of file
+            raise RuntimeError(f"OpenAI API call failed: {e}")
+
+    def _summarize_batch(self, batch: list[tuple[str, str, str]]) -> list[str]:
+        prompt = build_batch_summary_prompt(batch)
+        self._wait_for_capacity(prompt, MAX_OUTPUT_TOKENS * len(batch))
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model_name,
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant that summarizes command outputs."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=MAX_OUTPUT_TOKENS * len(batch),
+                temperature=0.1,
+            )
+            response_text = response.choices[0].message.content.strip()
+        except Exception as e:
+            raise RuntimeError(f"OpenAI API call failed: {e}")
+        return parse_batch_summaries(response_text, len(batch))
@@ -1,82 +1,226 @@
-
-
 import argparse
-import os
-from nlba.llm_interface import MockLLMProvider, GeminiLLMProvider, OpenAILLMProvider
+import time
 from nlba.command_executor import CommandExecutor
-from nlba.config_manager import load_config, save_config, log_request, get_history_file_path, get_history_entry
-
-def run_nlba(request: str, provider: str = "mock", skip_confirmation: bool = False, summarize: bool = False):
-    if provider == "mock":
-        llm_provider = MockLLMProvider()
-    elif provider == "gemini":
-        llm_provider = GeminiLLMProvider()
-    elif provider == "openai":
-        llm_provider = OpenAILLMProvider()
-    else:
-        raise ValueError(f"Unknown LLM provider: {provider}")
+from nlba.config_manager import load_config, save_config, get_history_file_path, get_history_entry
+from nlba.completion import CompletionIndex, DEFAULT_PATTERNS, install_completer
+from nlba.plan import PlanStep, StepResult
+from nlba.router import RoutingLLMProvider
+from nlba.watch import OutputWatcher, LineChange
+from nlba.session import NLBASession, GenerationResult, ExecutionResult, SummaryResult
+
+def color_for(generation: GenerationResult) -> str:
+    if generation.destructive:
+        return "\033[91m"  # Red
+    return "\033[92m"  # Green
+
+def print_generation(generation: GenerationResult):
+    print(f"Generated command: {color_for(generation)}{generation.command}\033[0m")
+
+def confirm_execution() -> bool:
+    confirmation = input("Execute this command? (y/N): ").strip().lower()
+    if confirmation != 'y':
+        print("Command execution cancelled.")
+        return False
+    return True
+
+def print_execution(execution: ExecutionResult, color_code: str):
+    print("\n--- Command Output ---")
+    if execution.stdout:
+        print("STDOUT:")
+        print(f"{color_code}{execution.stdout}\033[0m")
+    if execution.stderr:
+        print("STDERR:")
+        print(f"{color_code}{execution.stderr}\033[0m")
+    print(f"Exit Code: {color_code}{execution.exit_code}\033[0m")
+    print("----------------------")
 
-    executor = CommandExecutor()
+def print_summary(summary: SummaryResult):
+    print("\n--- Summary ---")
+    print(summary.summary)
+    print("---------------")
 
+def handle_request(session: NLBASession, request: str, skip_confirmation: bool, summarize: bool):
     print(f"Your request: {request}")
 
     # Step 1: Generate bash command
-    bash_command, classification = llm_provider.generate_command(request)
-    if classification.lower() == "destructive":
-        color_code = "\033[91m"  # Red
-    else:
-        color_code = "\033[92m"  # Green
-    print(f"Generated command: {color_code}{bash_command}\033[0m")
+    generation = session.generate(request)
+    print_generation(generation)
 
     # Step 2: Confirm with user (unless --yes is used or skip_confirmation is True)
-    if not skip_confirmation:
-        confirmation = input("Execute this command? (y/N): ").strip().lower()
-        if confirmation != 'y':
-            print("Command execution cancelled.")
-            return
-    
-    log_request(request)
+    if not skip_confirmation and not confirm_execution():
+        return
 
-    # Step 3: Execute command
-    stdout, stderr, exit_code = executor.execute_command(bash_command)
+    session.record(request)
 
-    if classification == "destructive":
-        color_code = "\033[91m"  # Red
-    else:
-        color_code = "\033[92m"  # Green
-    # Determine color for output based on classification
-    if classification.lower() == "destructive":
-        color_code = "\033[91m"  # Red
-    else:
-        color_code = "\033[92m"  # Green
+    # Step 3: Execute command
+    execution = session.execute(generation.command)
+    session.record_outcome(request, execution)
+    print_execution(execution, color_for(generation))
 
-    print("\n--- Command Output ---")
-    if stdout:
+    if summarize:
+        print_summary(session.summarize(request, generation.command, execution.stdout))
+
+def print_plan(steps: list[PlanStep]):
+    print("Generated plan:")
+    for step in steps:
+        color_code = "\033[91m" if step.destructive else "\033[92m"
+        after = f" (after {', '.join(step.depends_on)})" if step.depends_on else ""
+        print(f"  [{step.id}] {color_code}{step.command}\033[0m{after}")
+
+def print_step_result(result: StepResult):
+    if result.skipped:
+        print(f"\n--- Step {result.step.id} skipped: a dependency failed ---")
+        return
+    color_code = "\033[91m" if result.step.destructive else "\033[92m"
+    print(f"\n--- Step {result.step.id}: {result.step.command} ({result.duration:.2f}s) ---")
+    if result.stdout:
         print("STDOUT:")
-        print(f"{color_code}{stdout}\033[0m")
-    if stderr:
+        print(f"{color_code}{result.stdout}\033[0m")
+    if result.stderr:
         print("STDERR:")
-        print(f"{color_code}{stderr}\033[0m")
-    print(f"Exit Code: {color_code}{exit_code}\033[0m")
-    print("----------------------")
+        print(f"{color_code}{result.stderr}\033[0m")
+    print(f"Exit Code: {color_code}{result.exit_code}\033[0m")
+
+def handle_plan(session: NLBASession, request: str, skip_confirmation: bool, summarize: bool):
+    print(f"Your request: {request}")
+
+    # Step 1: Generate the plan
+    try:
+        steps = session.plan(request)
+    except ValueError as e:
+        print(f"Could not generate a valid plan: {e}")
+        return
+    print_plan(steps)
+
+    # Step 2: Confirm the whole plan once
+    if not skip_confirmation:
+        confirmation = input("Execute this plan? (y/N): ").strip().lower()
+        if confirmation != 'y':
+            print("Plan execution cancelled.")
+            return
+
+    session.record(request)
+
+    # Step 3: Execute independent steps concurrently, printing each as it finishes
+    start = time.perf_counter()
+    results = []
+    for result in session.execute_plan(steps):
+        print_step_result(result)
+        results.append(result)
+    session.record_plan_outcome(request, results)
+    print(f"\nPlan finished in {time.perf_counter() - start:.2f}s")
 
     if summarize:
-        summary = llm_provider.summarize_output(request, bash_command, stdout)
+        summaries = session.summarize_plan(request, results)
         print("\n--- Summary ---")
-        print(summary)
+        for step in steps:
+            if step.id in summaries:
+                print(f"[{step.id}] {summaries[step.id]}")
         print("---------------")
 
-def run_interactive_shell(provider: str = "mock", summarize: bool = False):
-    if provider == "mock":
-        llm_provider = MockLLMProvider()
-    elif provider == "gemini":
-        llm_provider = GeminiLLMProvider()
-    elif provider == "openai":
-        llm_provider = OpenAILLMProvider()
-    else:
-        raise ValueError(f"Unknown LLM provider: {provider}")
+def print_changes(changes: list[LineChange], exit_code: int, stderr: str = ""):
+    print(f"\n--- {time.strftime('%H:%M:%S')}: {len(changes)} changed lines (exit code {exit_code}) ---")
+    for change in changes:
+        color_code = "\033[91m" if change.kind == '-' else "\033[92m"
+        print(f"{color_code}{change.kind} {change.line_number}: {change.text}\033[0m")
+    if stderr:
+        print("STDERR:")
+        print(f"\033[91m{stderr}\033[0m")
 
-    executor = CommandExecutor()
+def handle_watch(session: NLBASession, request: str, interval: float, skip_confirmation: bool, summarize: bool,
+                 max_runs: int = None):
+    print(f"Your request: {request}")
+
+    # Step 1: Generate the bash command once
+    generation = session.generate(request)
+    print_generation(generation)
+
+    # Step 2: Confirm once for the whole watch
+    if not skip_confirmation and not confirm_execution():
+        return
+
+    session.record(request)
+    summary_threshold = session.config.get('nlba', {}).get('watch_summary_threshold', 0.2)
+    watcher = OutputWatcher()
+    previous_exit_code = None
+    previous_stderr = None
+    runs = 0
+    print(f"Watching every {interval:g}s. Press Ctrl+C to stop.")
+
+    # Step 3: Re-run the command and print only what changed
+    try:
+        while max_runs is None or runs < max_runs:
+            start = time.monotonic()
+            execution = session.execute(generation.command)
+            runs += 1
+            if runs == 1:
+                # Later runs repeat the same command, so only the first one is journaled.
+                session.record_outcome(request, execution)
+            changes = watcher.update(execution.stdout)
+            # stderr is shown again only when it or the exit code changed, so a steady warning prints once.
+            stderr_changed = execution.stderr != previous_stderr or execution.exit_code != previous_exit_code
+            if changes or stderr_changed:
+                print_changes(changes, execution.exit_code, execution.stderr if stderr_changed else "")
+                if summarize and runs > 1 and watcher.change_ratio(changes) >= summary_threshold:
+                    print_summary(session.summarize(request, generation.command, execution.stdout))
+            previous_exit_code = execution.exit_code
+            previous_stderr = execution.stderr
+            if max_runs is None or runs < max_runs:
+                time.sleep(max(0.0, interval - (time.monotonic() - start)))
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+
+def print_routing_metrics(llm_provider):
+    if not isinstance(llm_provider, RoutingLLMProvider):
+        return
+    metrics = llm_provider.metrics
+    print("\n--- Model Routing ---")
+    for route in ("fast", "strong"):
+        route_metrics = metrics[route]
+        print(f"{route}: {route_metrics['calls']} calls, {route_metrics['average_latency']:.2f}s average latency")
+    print(f"escalations: {metrics['escalations']}")
+    print("---------------------")
+
+def print_prefetch_metrics(session: NLBASession):
+    metrics = session.prefetch_metrics
+    if not metrics or not metrics['speculative_calls']:
+        return
+    print("\n--- Prefetch ---")
+    print(f"hits: {metrics['hits']}, misses: {metrics['misses']}, hit rate: {metrics['hit_rate']:.0%}")
+    print(f"speculative calls: {metrics['speculative_calls']}, skipped by rate limit: {metrics['rate_limited']}")
+    print("----------------")
+
+def print_rate_limit_metrics(session: NLBASession):
+    metrics = {key: limiter_metrics for key, limiter_metrics in session.rate_limit_metrics.items() if limiter_metrics['calls']}
+    if not metrics:
+        return
+    print("\n--- Rate Limits ---")
+    for key, limiter_metrics in metrics.items():
+        print(f"{key}: {limiter_metrics['calls']} calls, {limiter_metrics['queued_calls']} queued, "
+              f"{limiter_metrics['total_wait']:.2f}s total wait, {limiter_metrics['max_wait']:.2f}s max wait")
+    print("-------------------")
+
+def run_nlba(request: str, provider: str = "mock", skip_confirmation: bool = False, summarize: bool = False, config: dict = None, plan: bool = False, watch: float = None):
+    with NLBASession(provider, config, executor=CommandExecutor()) as session:
+        if watch is not None:
+            handle_watch(session, request, watch, skip_confirmation, summarize)
+        elif plan:
+            handle_plan(session, request, skip_confirmation, summarize)
+        else:
+            handle_request(session, request, skip_confirmation, summarize)
+        print_routing_metrics(session.llm_provider)
+        print_rate_limit_metrics(session)
+
+def run_interactive_shell(provider: str = "mock", summarize: bool = False, config: dict = None):
+    session = NLBASession(provider, config, executor=CommandExecutor())
+    nlba_config = session.config.get('nlba', {})
+    session.enable_prefetch(
+        top_k=nlba_config.get('prefetch_top_k', 2),
+        budget=nlba_config.get('prefetch_budget', 20),
+    )
+    completion_index = CompletionIndex(patterns=nlba_config.get('completion_patterns', DEFAULT_PATTERNS))
+    completion_index.refresh()
+    install_completer(completion_index, "> ")
 
     print("Entering NLBA interactive shell. Type 'exit' or 'quit' to leave.")
     display_history()
@@ -103,40 +247,7 @@ def run_interactive_shell(provider: str = "mock", summarize: bool = False):
                     print(f"Invalid history command: {request}")
                     continue
 
-            print(f"Your request: {request}")
-
-            # Step 1: Generate bash command
-            bash_command, classification = llm_provider.generate_command(request)
-            if classification.lower() == "destructive":
-                color_code = "\033[91m"  # Red
-            else:
-                color_code = "\033[92m"  # Green
-            print(f"Generated command: {color_code}{bash_command}\033[0m")
-
-            # Step 2: Confirm with user
-            confirmation = input("Execute this command? (y/N): ").strip().lower()
-            if confirmation != 'y':
-                print("Command execution cancelled.")
-                continue
-            
-            log_request(request)
-
-            # Step 3: Execute command
-            stdout, stderr, exit_code = executor.execute_command(bash_command)
-
-            print("\n--- Command Output ---")
-            if stdout:
-                print(f"{color_code}{stdout}\033[0m")
-            if stderr:
-                print(f"{color_code}{stderr}\033[0m")
-            print(f"Exit Code: {color_code}{exit_code}\033[0m")
-            print("----------------------")
-
-            if summarize:
-                summary = llm_provider.summarize_output(request, bash_command, stdout)
-                print("\n--- Summary ---")
-                print(summary)
-                print("---------------")
+            handle_request(session, request, False, summarize)
 
         except KeyboardInterrupt:
             print("\nExiting NLBA interactive shell.")
@@ -144,6 +255,10 @@ def run_interactive_shell(provider: str = "mock", summarize: bool = False):
         except EOFError:
             print("\nExiting NLBA interactive shell.")
             break
+    print_routing_metrics(session.llm_provider)
+    print_rate_limit_metrics(session)
+    print_prefetch_metrics(session)
+    session.close()
 
 def display_history():
     history_file = get_history_file_path()
@@ -195,6 +310,19 @@ def main():
         help="Enable command output summarization."
     )
     
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Break the request into a multi-step plan and run independent steps in parallel."
+    )
+
+    parser.add_argument(
+        "--watch",
+        type=float,
+        metavar="SECONDS",
+        help="Re-run the generated command every SECONDS and show only the lines that changed."
+    )
+
     parser.add_argument(
         "--history",
         action="store_true",
@@ -203,6 +331,9 @@ def main():
 
     args = parser.parse_args()
 
+    if args.watch is not None and args.watch <= 0:
+        parser.error("--watch requires a positive number of seconds")
+
     if args.history:
         display_history()
         return
@@ -222,9 +353,9 @@ def main():
 
     if not args.request:
         # No request given, enter interactive shell mode
-        run_interactive_shell(provider_to_use, summarize_output)
+        run_interactive_shell(provider_to_use, summarize_output, config)
     else:
-        run_nlba(args.request, provider_to_use, args.yes, summarize_output)
+        run_nlba(args.request, provider_to_use, args.yes, summarize_output, config, args.plan, args.watch)
 
 if __name__ == "__main__":
     main()
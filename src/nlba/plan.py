@@ -0,0 +1,165 @@
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from nlba.command_executor import CommandExecutor
+
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+@dataclass
+class PlanStep:
+    """One command of a multi-step plan."""
+    id: str
+    command: str
+    depends_on: list = field(default_factory=list)
+    destructive: bool = False
+
+    @property
+    def classification(self) -> str:
+        return "destructive" if self.destructive else "non-destructive"
+
+
+@dataclass
+class StepResult:
+    """The outcome of one plan step. Skipped steps were not run because a dependency failed."""
+    step: PlanStep
+    stdout: str = ""
+    stderr: str = ""
+    exit_code: int = 0
+    duration: float = 0.0
+    skipped: bool = False
+
+    @property
+    def succeeded(self) -> bool:
+        return not self.skipped and self.exit_code == 0
+
+
+def validate_plan(steps: list[PlanStep]) -> list[PlanStep]:
+    """
+    Checks that step ids are unique and that the dependencies form a DAG.
+
+    Raises:
+        ValueError: If the plan is empty, has duplicate ids, unknown dependencies or a cycle.
+    """
+    if not steps:
+        raise ValueError("The plan has no steps")
+    ids = [step.id for step in steps]
+    if len(set(ids)) != len(ids):
+        raise ValueError(f"Duplicate step ids in plan: {ids}")
+    for step in steps:
+        unknown = [dependency for dependency in step.depends_on if dependency not in ids]
+        if unknown:
+            raise ValueError(f"Step '{step.id}' depends on unknown steps: {unknown}")
+
+    remaining = {step.id: set(step.depends_on) for step in steps}
+    while remaining:
+        ready = [step_id for step_id, dependencies in remaining.items() if not dependencies]
+        if not ready:
+            raise ValueError(f"The plan has a dependency cycle between: {sorted(remaining)}")
+        for step_id in ready:
+            del remaining[step_id]
+        for dependencies in remaining.values():
+            dependencies.difference_update(ready)
+    return steps
+
+
+def parse_plan(response_text: str) -> list[PlanStep]:
+    """
+    Parses a plan returned by an LLM.
+
+    The expected format is a JSON object with a "steps" list (a bare list is also
+    accepted), where every step has an "id", a "command", an optional "depends_on"
+    list of step ids and an optional "destructive" flag.
+
+    Raises:
+        ValueError: If the response is not a valid plan.
+    """
+    text = _CODE_FENCE.sub("", response_text.strip())
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"The plan is not valid JSON: {e}")
+    if isinstance(data, dict):
+        data = data.get("steps")
+    if not isinstance(data, list):
+        raise ValueError("The plan must contain a list of steps")
+
+    steps = []
+    for number, item in enumerate(data, 1):
+        if not isinstance(item, dict) or not item.get("command"):
+            raise ValueError(f"Plan step {number} has no command")
+        depends_on = item.get("depends_on") or []
+        if isinstance(depends_on, (str, int)):
+            # A single dependency is often given without the surrounding list.
+            depends_on = [depends_on]
+        destructive = item.get("destructive", False)
+        if isinstance(destructive, str):
+            destructive = destructive.lower() == "destructive" or destructive.lower() == "true"
+        steps.append(PlanStep(
+            id=str(item.get("id", number)),
+            command=item["command"],
+            depends_on=[str(dependency) for dependency in depends_on],
+            destructive=bool(destructive),
+        ))
+    return validate_plan(steps)
+
+
+class PlanExecutor:
+    """
+    Runs the steps of a plan on a bounded worker pool, respecting their dependencies.
+
+    A step is started as soon as all of its dependencies have succeeded, so
+    independent steps run concurrently and the total wall time approaches the
+    plan's critical path. Steps that depend on a failed step are skipped.
+    """
+
+    def __init__(self, executor: CommandExecutor = None, max_workers: int = 4):
+        self.executor = executor or CommandExecutor()
+        self.max_workers = max_workers
+
+    def run(self, steps: list[PlanStep]) -> Iterator[StepResult]:
+        """
+        Validates and executes a plan.
+
+        Yields:
+            A StepResult for every step, in the order the steps finish.
+
+        Raises:
+            ValueError: If the plan is not a valid DAG.
+        """
+        validate_plan(steps)
+        pending = {step.id: step for step in steps}
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="nlba-plan") as pool:
+            running = {}
+            while pending or running:
+                progressed = False
+                for step in list(pending.values()):
+                    dependencies = [results.get(dependency) for dependency in step.depends_on]
+                    if any(result is not None and not result.succeeded for result in dependencies):
+                        del pending[step.id]
+                        results[step.id] = StepResult(step, skipped=True)
+                        progressed = True
+                        yield results[step.id]
+                    elif all(result is not None for result in dependencies):
+                        del pending[step.id]
+                        running[pool.submit(self._run_step, step)] = step
+                        progressed = True
+                if not running:
+                    if not progressed:
+                        raise RuntimeError(f"Plan steps can never start: {sorted(pending)}")
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = running.pop(future)
+                    results[step.id] = future.result()
+                    yield results[step.id]
+
+    def _run_step(self, step: PlanStep) -> StepResult:
+        start = time.perf_counter()
+        stdout, stderr, exit_code = self.executor.execute_command(step.command)
+        return StepResult(step, stdout, stderr, exit_code, time.perf_counter() - start)
@@ -0,0 +1,164 @@
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from nlba.config_manager import get_history_file_path
+from nlba.llm_interface import BaseLLMProvider, speculative_calls
+from nlba.rate_limiter import RateLimitExceeded
+
+
+class RequestPredictor:
+    """
+    Lightweight n-gram (Markov) model over the sequence of past requests.
+
+    For every context of up to `order` preceding requests it counts which request
+    came next. Predictions use the longest matching context first and back off to
+    shorter ones.
+    """
+
+    def __init__(self, order: int = 2):
+        self.order = order
+        self._counts = defaultdict(Counter)
+        self._recent = []
+
+    def observe(self, request: str):
+        """Adds one request to the model, in history order."""
+        request = request.strip()
+        if not request:
+            return
+        for n in range(1, min(self.order, len(self._recent)) + 1):
+            self._counts[tuple(self._recent[-n:])][request] += 1
+        self._recent.append(request)
+        del self._recent[:-self.order]
+
+    def load_history(self, history_file=None):
+        """Trains the model on the requests stored in the history file."""
+        history_file = history_file or get_history_file_path()
+        if not history_file.exists():
+            return
+        with open(history_file, 'r') as f:
+            for line in f:
+                self.observe(line)
+
+    def predict(self, k: int = 3, after: str = None) -> list[str]:
+        """
+        Predicts the most likely next requests after the ones observed so far.
+
+        Args:
+            k: The maximum number of predictions.
+            after: A request that has not been observed yet but should be treated as the latest one.
+
+        Returns:
+            The predicted requests, most likely first.
+        """
+        recent = self._recent + [after.strip()] if after else self._recent
+        predictions = []
+        for n in range(min(self.order, len(recent)), 0, -1):
+            for request, _ in self._counts.get(tuple(recent[-n:]), Counter()).most_common():
+                if request not in predictions:
+                    predictions.append(request)
+                    if len(predictions) == k:
+                        return predictions
+        return predictions
+
+
+class Prefetcher:
+    """
+    Speculatively generates commands for the requests the user is likely to type next.
+
+    While the user reads output or confirms a command, the top predicted requests are
+    sent to the provider in the background and their commands are kept in a small
+    cache. A request that was predicted correctly is then answered from the cache
+    without a round trip. The number of speculative calls is capped by `budget`, and
+    they only use rate-limit capacity that is free at the time, so a wrong guess
+    never delays a real request.
+    """
+
+    def __init__(self, llm_provider: BaseLLMProvider, predictor: RequestPredictor, top_k: int = 2,
+                 budget: int = 20, cache_size: int = 32):
+        """
+        Args:
+            llm_provider: The provider used for both real and speculative generation.
+            predictor: The model predicting the next requests.
+            top_k: How many predicted requests to prefetch after each request.
+            budget: The maximum number of speculative calls for the lifetime of the prefetcher.
+            cache_size: The maximum number of prefetched commands kept at once.
+        """
+        self.llm_provider = llm_provider
+        self.predictor = predictor
+        self.top_k = top_k
+        self.budget = budget
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # request -> Future of (command, classification)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, top_k), thread_name_prefix="nlba-prefetch")
+        self._metrics = {'hits': 0, 'misses': 0, 'speculative_calls': 0, 'rate_limited': 0}
+
+    @property
+    def metrics(self) -> dict:
+        """Cache hits and misses, speculative calls made or skipped by the rate limiter, and the hit rate."""
+        with self._lock:
+            metrics = dict(self._metrics)
+        lookups = metrics['hits'] + metrics['misses']
+        metrics['hit_rate'] = metrics['hits'] / lookups if lookups else 0.0
+        return metrics
+
+    def generate_command(self, natural_language_request: str) -> tuple[str, str]:
+        """
+        Returns the command for a request, using a prefetched result when available.
+
+        A prefetched result is used at most once. If its speculative call failed, the
+        command is generated again in the foreground.
+        """
+        key = natural_language_request.strip()
+        with self._lock:
+            future = self._cache.pop(key, None)
+        if future is not None:
+            try:
+                result = future.result()
+            except Exception:
+                pass
+            else:
+                with self._lock:
+                    self._metrics['hits'] += 1
+                return result
+        with self._lock:
+            self._metrics['misses'] += 1
+        return self.llm_provider.generate_command(natural_language_request)
+
+    def observe(self, request: str):
+        """Records an executed request so that it informs future predictions."""
+        self.predictor.observe(request)
+
+    def prefetch(self, after: str = None):
+        """
+        Starts background generation for the top predicted next requests.
+
+        Args:
+            after: The request currently being handled, if it has not been observed yet.
+        """
+        if self.top_k <= 0:
+            return
+        for request in self.predictor.predict(self.top_k, after):
+            with self._lock:
+                if request in self._cache:
+                    continue
+                if self._metrics['speculative_calls'] >= self.budget:
+                    return
+                self._metrics['speculative_calls'] += 1
+                self._cache[request] = self._pool.submit(self._speculate, request)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+    def _speculate(self, request: str) -> tuple[str, str]:
+        with speculative_calls():
+            try:
+                return self.llm_provider.generate_command(request)
+            except RateLimitExceeded:
+                with self._lock:
+                    self._metrics['rate_limited'] += 1
+                raise
+
+    def close(self):
+        """Stops the background workers without waiting for pending speculative calls."""
+        self._pool.shutdown(wait=False)
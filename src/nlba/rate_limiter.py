@@ -0,0 +1,155 @@
+import sqlite3
+import threading
+import time
+
+from nlba.config_manager import CONFIG_DIR
+
+RATE_LIMIT_DB_FILE = CONFIG_DIR / "rate_limits.db"
+
+
+class RateLimitExceeded(RuntimeError):
+    """Raised when a call that must not wait finds no free rate-limit capacity."""
+
+
+class RateLimiter:
+    """
+    Client-side token-bucket rate limiter shared by all local nlba processes.
+
+    Each provider/model pair has one row in a SQLite database holding two buckets:
+    one for requests per minute and one for tokens per minute. Callers reserve
+    capacity inside an exclusive transaction and are allowed to push the buckets
+    into debt; the size of the debt is how long they must wait. Every caller
+    therefore gets a slot behind the ones that reserved before it, which queues
+    processes fairly instead of letting them race and retry on 429 responses.
+    """
+
+    def __init__(self, key: str, requests_per_minute: float = None, tokens_per_minute: float = None,
+                 db_file=None):
+        """
+        Args:
+            key: The bucket name, usually "<provider>/<model>".
+            requests_per_minute: The request quota, or None for no request limit.
+            tokens_per_minute: The token quota, or None for no token limit.
+            db_file: The SQLite file holding the shared state.
+        """
+        self.key = key
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.db_file = db_file or RATE_LIMIT_DB_FILE
+        self._lock = threading.Lock()
+        self._metrics = {'calls': 0, 'queued_calls': 0, 'total_wait': 0.0, 'max_wait': 0.0}
+
+    @property
+    def metrics(self) -> dict:
+        """Queue wait statistics for the calls made through this limiter in this process."""
+        with self._lock:
+            return dict(self._metrics)
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Blocks until the quota allows one more request of the given size.
+
+        Args:
+            tokens: The estimated number of tokens the request will consume.
+
+        Returns:
+            The number of seconds spent waiting in the queue.
+        """
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        with self._lock:
+            self._metrics['calls'] += 1
+            if wait > 0:
+                self._metrics['queued_calls'] += 1
+            self._metrics['total_wait'] += wait
+            self._metrics['max_wait'] = max(self._metrics['max_wait'], wait)
+        return wait
+
+    def try_acquire(self, tokens: int = 0) -> bool:
+        """
+        Takes capacity for one request only if it is available right now.
+
+        Unlike `acquire`, this never queues and never pushes the buckets into debt,
+        so it cannot delay other callers.
+
+        Returns:
+            True if the request may proceed immediately.
+        """
+        acquired = self._reserve(tokens, allow_wait=False) is not None
+        if acquired:
+            with self._lock:
+                self._metrics['calls'] += 1
+        return acquired
+
+    def _reserve(self, tokens: int, allow_wait: bool = True):
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+        try:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "key TEXT PRIMARY KEY, requests REAL, tokens REAL, updated REAL)"
+            )
+            # BEGIN IMMEDIATE takes the write lock up front so reservations are serialized.
+            connection.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = connection.execute(
+                "SELECT requests, tokens, updated FROM buckets WHERE key = ?", (self.key,)
+            ).fetchone()
+            if row is None:
+                request_level, token_level, updated = self.requests_per_minute, self.tokens_per_minute, now
+            else:
+                request_level, token_level, updated = row
+            elapsed = max(0.0, now - updated)
+
+            wait = 0.0
+            if self.requests_per_minute:
+                request_level = self._refill(request_level, self.requests_per_minute, elapsed) - 1
+                wait = max(wait, -request_level * 60.0 / self.requests_per_minute)
+            if self.tokens_per_minute:
+                # A request larger than the whole quota can never fit; charge it as a full minute.
+                cost = min(tokens, self.tokens_per_minute)
+                token_level = self._refill(token_level, self.tokens_per_minute, elapsed) - cost
+                wait = max(wait, -token_level * 60.0 / self.tokens_per_minute)
+
+            if wait > 0 and not allow_wait:
+                connection.execute("ROLLBACK")
+                return None
+            connection.execute(
+                "INSERT OR REPLACE INTO buckets (key, requests, tokens, updated) VALUES (?, ?, ?, ?)",
+                (self.key, request_level, token_level, now),
+            )
+            connection.execute("COMMIT")
+            return wait
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _refill(level, per_minute, elapsed):
+        if level is None:
+            level = per_minute
+        return min(per_minute, level + elapsed * per_minute / 60.0)
+
+
+def get_rate_limiter(config: dict, provider: str, model: str):
+    """
+    Builds the rate limiter configured for a provider/model pair.
+
+    Limits are read from the `rate_limits` section of config.yaml, e.g.:
+
+        rate_limits:
+          gemini:
+            gemini-1.5-flash:
+              requests_per_minute: 15
+              tokens_per_minute: 1000000
+
+    Returns:
+        A RateLimiter, or None if no limits are configured for the pair.
+    """
+    limits = ((config or {}).get('rate_limits') or {}).get(provider) or {}
+    model_limits = limits.get(model) or {}
+    requests_per_minute = model_limits.get('requests_per_minute')
+    tokens_per_minute = model_limits.get('tokens_per_minute')
+    if not requests_per_minute and not tokens_per_minute:
+        return None
+    return RateLimiter(f"{provider}/{model}", requests_per_minute, tokens_per_minute)
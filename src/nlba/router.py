@@ -0,0 +1,157 @@
+import re
+import threading
+import time
+
+from nlba.config_manager import load_journal
+from nlba.llm_interface import BaseLLMProvider, BATCH_TOKEN_BUDGET, is_speculative
+from nlba.plan import PlanStep
+from nlba.rate_limiter import RateLimitExceeded
+
+# Tools whose use usually calls for non-trivial flags or composition.
+KNOWN_TOOLS = {
+    'awk', 'sed', 'grep', 'find', 'xargs', 'sort', 'uniq', 'cut', 'tr', 'jq', 'curl', 'wget', 'tar',
+    'zip', 'rsync', 'ssh', 'scp', 'git', 'docker', 'kubectl', 'systemctl', 'journalctl', 'crontab',
+    'ps', 'netstat', 'ss', 'lsof', 'du', 'df', 'chmod', 'chown', 'openssl', 'ffmpeg',
+}
+
+# Phrases that suggest the command needs pipes, loops or several stages.
+COMPOSITION_CUES = (
+    'each', 'every', 'for all', 'then', 'pipe', 'count', 'sort', 'recursively', 'unless',
+    'except', 'group by', 'top', 'largest', 'newer than', 'older than', 'replace', 'loop',
+)
+
+_WORD = re.compile(r"[a-z0-9_.-]+")
+
+
+def _words(text: str) -> set:
+    return set(_WORD.findall(text.lower()))
+
+
+class RequestRouter:
+    """
+    Scores how hard a request is to turn into a command, using only local signals.
+
+    The score grows with the request length, the number of tools it mentions, the
+    cues that it needs pipes or loops, and the failure rate of similar past
+    requests recorded in the journal. Requests scoring at or above the threshold
+    are routed to the strong model.
+    """
+
+    def __init__(self, threshold: float = 2.0, journal: list = None):
+        """
+        Args:
+            threshold: The score from which requests go to the strong model.
+            journal: Past outcomes as dicts with "request" and "exit_code"; loaded from the journal file when omitted.
+        """
+        self.threshold = threshold
+        if journal is None:
+            journal = load_journal()
+        self._outcomes = [(_words(entry.get('request', '')), entry.get('exit_code', 0) != 0) for entry in journal]
+
+    def record(self, request: str, exit_code: int):
+        """Adds an outcome observed in this process, so it affects the routing of later requests."""
+        self._outcomes.append((_words(request), exit_code != 0))
+
+    def failure_rate(self, request: str, min_similarity: float = 0.5) -> float:
+        """Returns the share of similar past requests whose command failed."""
+        words = _words(request)
+        if not words:
+            return 0.0
+        similar = [failed for past_words, failed in self._outcomes
+                   if past_words and len(words & past_words) / len(words | past_words) >= min_similarity]
+        return sum(similar) / len(similar) if similar else 0.0
+
+    def score(self, request: str) -> float:
+        """Returns the complexity score of a request."""
+        lowered = request.lower()
+        words = _words(request)
+        score = 0.0
+        word_count = len(lowered.split())
+        if word_count > 12:
+            score += 1
+        if word_count > 25:
+            score += 1
+        tools = len(words & KNOWN_TOOLS)
+        if tools >= 2:
+            score += 1
+        score += min(2, sum(1 for cue in COMPOSITION_CUES if re.search(rf"\b{cue}\b", lowered)))
+        score += 2 * self.failure_rate(request)
+        return score
+
+    def route(self, request: str) -> str:
+        """Returns "strong" or "fast" for a request."""
+        return "strong" if self.score(request) >= self.threshold else "fast"
+
+
+class RoutingLLMProvider(BaseLLMProvider):
+    """
+    Sends easy requests to a fast model and hard ones to a strong model.
+
+    If the fast model fails or returns an empty command, the request is escalated
+    to the strong model. Latency per route and the number of escalations are
+    available from `metrics`; speculative prefetch calls are left out of them.
+    """
+
+    def __init__(self, fast: BaseLLMProvider, strong: BaseLLMProvider, router: RequestRouter = None):
+        self.fast = fast
+        self.strong = strong
+        self.router = router or RequestRouter()
+        self._lock = threading.Lock()
+        self._metrics = {
+            'fast': {'calls': 0, 'total_latency': 0.0},
+            'strong': {'calls': 0, 'total_latency': 0.0},
+            'escalations': 0,
+        }
+
+    @property
+    def metrics(self) -> dict:
+        """Calls and average latency per route, and the number of escalations."""
+        with self._lock:
+            metrics = {'escalations': self._metrics['escalations']}
+            for route in ('fast', 'strong'):
+                calls = self._metrics[route]['calls']
+                total_latency = self._metrics[route]['total_latency']
+                metrics[route] = {
+                    'calls': calls,
+                    'total_latency': total_latency,
+                    'average_latency': total_latency / calls if calls else 0.0,
+                }
+            return metrics
+
+    def _call(self, route: str, method: str, *args):
+        provider = self.fast if route == "fast" else self.strong
+        if is_speculative():
+            return getattr(provider, method)(*args)
+        start = time.perf_counter()
+        try:
+            return getattr(provider, method)(*args)
+        finally:
+            with self._lock:
+                self._metrics[route]['calls'] += 1
+                self._metrics[route]['total_latency'] += time.perf_counter() - start
+
+    def generate_command(self, natural_language_request: str) -> tuple[str, str]:
+        if self.router.route(natural_language_request) == "strong":
+            return self._call("strong", "generate_command", natural_language_request)
+        try:
+            command, classification = self._call("fast", "generate_command", natural_language_request)
+            if command.strip():
+                return command, classification
+        except RateLimitExceeded:
+            raise
+        except RuntimeError:
+            pass
+        if not is_speculative():
+            with self._lock:
+                self._metrics['escalations'] += 1
+        return self._call("strong", "generate_command", natural_language_request)
+
+    def generate_plan(self, natural_language_request: str) -> list[PlanStep]:
+        # Plans are compound by definition, so they always go to the strong model.
+        return self._call("strong", "generate_plan", natural_language_request)
+
+    def summarize_output(self, request: str, command: str, output: str) -> str:
+        return self._call("fast", "summarize_output", request, command, output)
+
+    def summarize_outputs(self, items: list[tuple[str, str, str]], token_budget: int = BATCH_TOKEN_BUDGET) -> list[str]:
+        return self._call("fast", "summarize_outputs", items, token_budget)
@@ -0,0 +1,324 @@
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Optional
+
+from nlba.command_executor import CommandExecutor
+from nlba.config_manager import load_config, log_request, log_outcome
+from nlba.llm_interface import (
+    BaseLLMProvider, MockLLMProvider, GeminiLLMProvider, OpenAILLMProvider, GEMINI_MODEL, OPENAI_MODEL
+)
+from nlba.plan import PlanExecutor, PlanStep, StepResult, validate_plan
+from nlba.prefetch import RequestPredictor, Prefetcher
+from nlba.rate_limiter import get_rate_limiter
+from nlba.router import RequestRouter, RoutingLLMProvider
+from nlba.summary_batcher import SummaryBatcher
+
+
+def _create_model_provider(provider: str, model: str, config: dict) -> BaseLLMProvider:
+    if provider == "gemini":
+        return GeminiLLMProvider(model, rate_limiter=get_rate_limiter(config, "gemini", model))
+    return OpenAILLMProvider(model, rate_limiter=get_rate_limiter(config, "openai", model))
+
+
+def create_llm_provider(provider: str, config: dict = None) -> BaseLLMProvider:
+    """
+    Creates the LLM provider by name, applying any rate limits configured for it.
+
+    When `routing` is configured for the provider, e.g.:
+
+        routing:
+          gemini:
+            fast: gemini-1.5-flash
+            strong: gemini-1.5-pro
+            threshold: 2.0
+
+    a RoutingLLMProvider is returned that picks the model per request.
+    """
+    if provider == "mock":
+        return MockLLMProvider()
+    if provider not in ("gemini", "openai"):
+        raise ValueError(f"Unknown LLM provider: {provider}")
+
+    default_model = GEMINI_MODEL if provider == "gemini" else OPENAI_MODEL
+    routes = ((config or {}).get('routing') or {}).get(provider)
+    if not routes:
+        return _create_model_provider(provider, default_model, config)
+    fast = _create_model_provider(provider, routes.get('fast', default_model), config)
+    strong = _create_model_provider(provider, routes.get('strong', default_model), config)
+    return RoutingLLMProvider(fast, strong, RequestRouter(routes.get('threshold', 2.0)))
+
+
+@dataclass
+class GenerationResult:
+    """A bash command generated for a natural language request."""
+    request: str
+    command: str
+    classification: str
+    duration: float
+
+    @property
+    def destructive(self) -> bool:
+        return self.classification.lower() == "destructive"
+
+
+@dataclass
+class ExecutionResult:
+    """The outcome of running a bash command."""
+    command: str
+    stdout: str
+    stderr: str
+    exit_code: int
+    duration: float
+
+
+@dataclass
+class SummaryResult:
+    """A natural language summary of a command's output."""
+    summary: str
+    duration: float
+
+
+@dataclass
+class RunResult:
+    """The result of handling a request end to end."""
+    generation: GenerationResult
+    execution: Optional[ExecutionResult] = None
+    summary: Optional[SummaryResult] = None
+    timings: dict = field(default_factory=dict)
+
+    @property
+    def cancelled(self) -> bool:
+        return self.execution is None
+
+
+class NLBASession:
+    """
+    Reusable entry point for embedding NLBA in other Python code.
+
+    The provider, executor and configuration are built once and shared by every
+    call, and each step returns a typed result instead of printing. The CLI is a
+    renderer on top of this class.
+
+    Usage:
+        session = NLBASession(provider="gemini")
+        result = session.run("list files", summarize=True)
+        print(result.execution.stdout, result.summary.summary)
+    """
+
+    def __init__(self, provider: str = "mock", config: dict = None, llm_provider: BaseLLMProvider = None,
+                 executor: CommandExecutor = None, summarize: bool = None):
+        """
+        Args:
+            provider: The name of the LLM provider to create ("mock", "gemini" or "openai").
+            config: The configuration to use; loaded from the config files when omitted.
+            llm_provider: An already created provider, used instead of `provider`.
+            executor: The command executor; a new CommandExecutor when omitted.
+            summarize: Whether `run` summarizes output by default; taken from the config when omitted.
+        """
+        self.config = config if config is not None else load_config()
+        self.llm_provider = llm_provider or create_llm_provider(provider, self.config)
+        self.executor = executor or CommandExecutor()
+        if summarize is None:
+            summarize = self.config.get('nlba', {}).get('summarize', False)
+        self.summarize_by_default = summarize
+        self.prefetcher = None
+        self._summary_batcher = None
+        self._summaries_in_flight = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def enable_prefetch(self, top_k: int = 2, budget: int = 20):
+        """Prefetches commands for the requests predicted to follow the recorded ones."""
+        predictor = RequestPredictor()
+        predictor.load_history()
+        self.prefetcher = Prefetcher(self.llm_provider, predictor, top_k=top_k, budget=budget)
+
+    def close(self):
+        """Releases background resources held by the session."""
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+        with self._lock:
+            self._closed = True
+            batcher, self._summary_batcher = self._summary_batcher, None
+        if batcher is not None:
+            batcher.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def rate_limit_metrics(self) -> dict:
+        """Queue wait statistics of every rate limiter in use, keyed by "<provider>/<model>"."""
+        if isinstance(self.llm_provider, RoutingLLMProvider):
+            providers = [self.llm_provider.fast, self.llm_provider.strong]
+        else:
+            providers = [self.llm_provider]
+        return {
+            provider.rate_limiter.key: provider.rate_limiter.metrics
+            for provider in providers if provider.rate_limiter is not None
+        }
+
+    @property
+    def prefetch_metrics(self) -> dict:
+        """Prefetch hits, misses, hit rate and speculative calls, or None when prefetching is disabled."""
+        return self.prefetcher.metrics if self.prefetcher is not None else None
+
+    def generate(self, request: str) -> GenerationResult:
+        """Generates a bash command for a natural language request."""
+        start = time.perf_counter()
+        if self.prefetcher is not None:
+            command, classification = self.prefetcher.generate_command(request)
+            self.prefetcher.prefetch(after=request)
+        else:
+            command, classification = self.llm_provider.generate_command(request)
+        return GenerationResult(request, command, classification, time.perf_counter() - start)
+
+    def execute(self, command: str) -> ExecutionResult:
+        """Executes a bash command and captures its output."""
+        start = time.perf_counter()
+        stdout, stderr, exit_code = self.executor.execute_command(command)
+        return ExecutionResult(command, stdout, stderr, exit_code, time.perf_counter() - start)
+
+    def summarize(self, request: str, command: str, output: str) -> SummaryResult:
+        """
+        Summarizes a command's output in natural language.
+
+        A summary requested while another one is in flight (e.g. from several threads
+        or `asummarize`/`arun` tasks) goes through a micro-batching queue, so concurrent
+        summaries share one provider call. A lone summary, or one requested after
+        `close()`, is sent directly without waiting for the batching window.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            batcher = None
+            if self._summaries_in_flight and not self._closed:
+                if self._summary_batcher is None:
+                    self._summary_batcher = SummaryBatcher(
+                        self.llm_provider, max_wait=self.config.get('nlba', {}).get('summary_batch_wait', 0.005)
+                    )
+                batcher = self._summary_batcher
+            self._summaries_in_flight += 1
+        try:
+            if batcher is None:
+                summary = self.llm_provider.summarize_output(request, command, output)
+            else:
+                summary = batcher.submit(request, command, output).result()
+        finally:
+            with self._lock:
+                self._summaries_in_flight -= 1
+        return SummaryResult(summary, time.perf_counter() - start)
+
+    def plan(self, request: str) -> list[PlanStep]:
+        """
+        Generates a multi-step plan for a compound request.
+
+        Raises:
+            ValueError: If the provider returned a plan that is not a valid DAG.
+        """
+        return validate_plan(self.llm_provider.generate_plan(request))
+
+    def execute_plan(self, steps: list[PlanStep], max_workers: int = None) -> Iterator[StepResult]:
+        """
+        Executes the steps of a plan concurrently, respecting their dependencies.
+
+        Args:
+            steps: The plan steps, as returned by `plan`.
+            max_workers: The number of steps that may run at once; `nlba.plan_workers` from the config by default.
+
+        Yields:
+            A StepResult for every step as soon as it finishes.
+        """
+        if max_workers is None:
+            max_workers = self.config.get('nlba', {}).get('plan_workers', 4)
+        return PlanExecutor(self.executor, max_workers).run(steps)
+
+    def summarize_plan(self, request: str, results: list[StepResult]) -> dict:
+        """
+        Summarizes the output of every executed step using batched provider calls.
+
+        Returns:
+            The summaries keyed by step id.
+        """
+        executed = [result for result in results if not result.skipped]
+        summaries = self.llm_provider.summarize_outputs(
+            [(request, result.step.command, result.stdout) for result in executed]
+        )
+        return dict(zip((result.step.id for result in executed), summaries))
+
+    def record(self, request: str):
+        """Adds a request that is about to be executed to the history."""
+        log_request(request)
+        if self.prefetcher is not None:
+            self.prefetcher.observe(request)
+
+    def record_outcome(self, request: str, execution: ExecutionResult):
+        """Adds the outcome of an executed request to the journal used for model routing."""
+        self._log_outcome(request, execution.command, execution.exit_code)
+
+    def record_plan_outcome(self, request: str, results: list[StepResult]):
+        """
+        Adds the outcome of an executed plan to the journal as a single entry.
+
+        The plan counts as failed with the exit code of its first failed step; skipped steps are not counted.
+        """
+        failed = [result for result in results if not result.skipped and result.exit_code != 0]
+        command = "; ".join(result.step.command for result in results if not result.skipped)
+        self._log_outcome(request, command, failed[0].exit_code if failed else 0)
+
+    def _log_outcome(self, request: str, command: str, exit_code: int):
+        log_outcome(request, command, exit_code)
+        if isinstance(self.llm_provider, RoutingLLMProvider):
+            self.llm_provider.router.record(request, exit_code)
+
+    def run(self, request: str, confirm: Callable[[GenerationResult], bool] = None,
+            summarize: bool = None) -> RunResult:
+        """
+        Generates, executes and optionally summarizes a request.
+
+        Args:
+            request: The natural language request.
+            confirm: Called with the generated command before execution; returning
+                False cancels the run. Commands are executed without asking when omitted.
+            summarize: Whether to summarize the output; the session default when omitted.
+
+        Returns:
+            The results of every step that ran. `execution` is None if the run was cancelled.
+        """
+        result = RunResult(self.generate(request))
+        result.timings['generate'] = result.generation.duration
+        if confirm is not None and not confirm(result.generation):
+            return result
+
+        self.record(request)
+        result.execution = self.execute(result.generation.command)
+        result.timings['execute'] = result.execution.duration
+        self.record_outcome(request, result.execution)
+
+        if summarize is None:
+            summarize = self.summarize_by_default
+        if summarize:
+            result.summary = self.summarize(request, result.generation.command, result.execution.stdout)
+            result.timings['summarize'] = result.summary.duration
+        return result
+
+    async def agenerate(self, request: str) -> GenerationResult:
+        """Async variant of `generate`, run in a worker thread."""
+        return await asyncio.to_thread(self.generate, request)
+
+    async def aexecute(self, command: str) -> ExecutionResult:
+        """Async variant of `execute`, run in a worker thread."""
+        return await asyncio.to_thread(self.execute, command)
+
+    async def asummarize(self, request: str, command: str, output: str) -> SummaryResult:
+        """Async variant of `summarize`, run in a worker thread."""
+        return await asyncio.to_thread(self.summarize, request, command, output)
+
+    async def arun(self, request: str, confirm: Callable[[GenerationResult], bool] = None,
+                   summarize: bool = None) -> RunResult:
+        """Async variant of `run`, run in a worker thread."""
+        return await asyncio.to_thread(self.run, request, confirm, summarize)
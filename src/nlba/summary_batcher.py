@@ -0,0 +1,103 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from nlba.llm_interface import BaseLLMProvider, BATCH_TOKEN_BUDGET
+
+
+class SummaryBatcher:
+    """
+    Collects summarization requests for a few milliseconds and sends them to the
+    provider together, so that bursts of summaries cost one round trip instead of many.
+
+    Usage:
+        with SummaryBatcher(provider) as batcher:
+            future = batcher.submit(request, command, output)
+            summary = future.result()
+    """
+
+    def __init__(self, llm_provider: BaseLLMProvider, max_wait: float = 0.005, max_items: int = 16,
+                 token_budget: int = BATCH_TOKEN_BUDGET):
+        """
+        Args:
+            llm_provider: The provider used to summarize the collected items.
+            max_wait: Seconds to wait for more items after the first one arrives.
+            max_items: The maximum number of items flushed together.
+            token_budget: The maximum estimated prompt size of a single provider call.
+        """
+        self.llm_provider = llm_provider
+        self.max_wait = max_wait
+        self.max_items = max_items
+        self.token_budget = token_budget
+        self._queue = queue.Queue()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="nlba-summary-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, request: str, command: str, output: str) -> Future:
+        """
+        Queues a command output for summarization.
+
+        Returns:
+            A future that resolves to the summary.
+        """
+        if self._closed:
+            raise RuntimeError("SummaryBatcher is closed")
+        future = Future()
+        self._queue.put(((request, command, output), future))
+        return future
+
+    def close(self):
+        """Flushes the pending items and stops the worker thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            pending = [first]
+            stop = False
+            deadline = time.monotonic() + self.max_wait
+            while len(pending) < self.max_items:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stop = True
+                    break
+                pending.append(entry)
+            self._flush(pending)
+            if stop:
+                return
+
+    def _flush(self, pending):
+        items = [item for item, _ in pending]
+        try:
+            summaries = self.llm_provider.summarize_outputs(items, self.token_budget)
+        except Exception as e:
+            for _, future in pending:
+                future.set_exception(e)
+            return
+        for index, (_, future) in enumerate(pending):
+            if index < len(summaries):
+                future.set_result(summaries[index])
+            else:
+                future.set_exception(RuntimeError(
+                    f"The provider returned {len(summaries)} summaries for {len(pending)} items"
+                ))
@@ -0,0 +1,78 @@
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+
+
+@dataclass
+class LineChange:
+    """A line removed ("-") from or added ("+") to the output, with its 1-based line number."""
+    kind: str
+    line_number: int
+    text: str
+
+
+def diff_lines(previous: list[str], current: list[str]) -> list[LineChange]:
+    """
+    Computes the lines that changed between two runs of a command.
+
+    Unchanged output is detected with a single comparison, and the common leading
+    and trailing lines are trimmed before diffing, so the work done by the
+    sequence matcher is proportional to the changed region rather than the full output.
+
+    Returns:
+        The removed lines (numbered in the previous output) and the added lines
+        (numbered in the current output), in output order.
+    """
+    if previous == current:
+        return []
+    limit = min(len(previous), len(current))
+    prefix = 0
+    while prefix < limit and previous[prefix] == current[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and previous[-1 - suffix] == current[-1 - suffix]:
+        suffix += 1
+    old = previous[prefix:len(previous) - suffix]
+    new = current[prefix:len(current) - suffix]
+
+    changes = []
+    matcher = SequenceMatcher(None, old, new, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        changes.extend(LineChange('-', prefix + i + 1, old[i]) for i in range(i1, i2))
+        changes.extend(LineChange('+', prefix + j + 1, new[j]) for j in range(j1, j2))
+    return changes
+
+
+class OutputWatcher:
+    """Keeps the previous output of a watched command and reports what changed."""
+
+    def __init__(self):
+        self.previous = None
+        self._compared_lines = 0
+
+    def update(self, output: str) -> list[LineChange]:
+        """
+        Records a new output.
+
+        Returns:
+            The changes since the previous output; every line is reported as added on the first call.
+        """
+        current = output.splitlines()
+        if self.previous is None:
+            changes = [LineChange('+', number, line) for number, line in enumerate(current, 1)]
+        else:
+            changes = diff_lines(self.previous, current)
+        self._compared_lines = max(len(self.previous or ()), len(current))
+        self.previous = current
+        return changes
+
+    def change_ratio(self, changes: list[LineChange]) -> float:
+        """
+        Returns the share of lines that changed in the last update.
+
+        A modified line is reported both as removed and as added, so the changed lines
+        are counted as the larger of the two, relative to the longer of the two outputs.
+        """
+        removed = sum(1 for change in changes if change.kind == '-')
+        return max(removed, len(changes) - removed) / max(self._compared_lines, 1)
@@ -3,6 +3,12 @@ from unittest.mock import patch
 import yaml
 from pathlib import Path
 
+@pytest.fixture(autouse=True)
+def isolate_journal(tmp_path):
+    # Keep test runs out of the real outcome journal that model routing reads.
+    with patch('nlba.config_manager.JOURNAL_FILE', new=tmp_path / "journal.jsonl"):
+        yield tmp_path / "journal.jsonl"
+
 @pytest.fixture
 def setup_config_files(tmp_path):
     # Mock Path.home() and Path.cwd() to control config locations
@@ -0,0 +1,118 @@
+import timeit
+from unittest.mock import MagicMock, patch
+from nlba.completion import CompletionIndex, install_completer
+
+
+def test_complete_ranks_by_frequency_then_recency(tmp_path):
+    history_file = tmp_path / "history.log"
+    history_file.write_text("list files\nlist folders\nlist files\nlist processes\n")
+    index = CompletionIndex(history_file)
+    index.refresh()
+
+    assert index.complete("list") == ["list files", "list processes", "list folders"]
+    assert index.complete("list f") == ["list files", "list folders"]
+    assert index.complete("remove") == []
+
+def test_refresh_reads_only_appended_lines(tmp_path):
+    history_file = tmp_path / "history.log"
+    history_file.write_text("list files\n")
+    index = CompletionIndex(history_file)
+    index.refresh()
+
+    with open(history_file, 'a') as f:
+        f.write("list folders\nlist fol")  # the last line is still being written
+    index.refresh()
+    assert len(index) == 2
+    assert index.complete("list fol") == ["list folders"]
+
+    with open(history_file, 'a') as f:
+        f.write("ders\n")
+    index.refresh()
+    assert index.complete("list fol") == ["list folders"]
+    assert index._stats["list folders"][0] == 2
+
+def test_patterns_seed_the_index(tmp_path):
+    index = CompletionIndex(tmp_path / "missing.log", patterns=["create directory", "count lines"])
+    index.refresh()
+
+    assert index.complete("c") == ["count lines", "create directory"]
+
+def best_time(function, repeat=5):
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+def test_complete_large_history_is_fast(tmp_path):
+    history_file = tmp_path / "history.log"
+    # Rarely used "zzz" entries written first: more than _RANGE_SCAN_LIMIT of them, all ranked last.
+    lines = [f"zzz old request {i}\n" for i in range(300)]
+    lines += [f"request number {i % 50_000}\n" for i in range(99_700)]
+    lines += [f"alpha request {i}\n" for i in range(100_000)]
+    history_file.write_text("".join(lines))
+    index = CompletionIndex(history_file)
+    index.refresh()
+
+    for prefix in ("", "request", "request number 4", "request number 49999", "zzz", "alpha request 5"):
+        assert index.complete(prefix)
+        assert best_time(lambda: index.complete(prefix)) < 0.001, prefix
+
+    assert len(index.complete("zzz")) == 10
+    assert index.complete("zzz")[0] == "zzz old request 299"
+    assert "request number 4999" in index.complete("request number 4999", limit=20)
+
+def test_complete_stays_fast_after_add(tmp_path):
+    history_file = tmp_path / "history.log"
+    history_file.write_text("".join(f"request number {i}\n" for i in range(100_000)))
+    index = CompletionIndex(history_file)
+    index.refresh()
+
+    assert best_time(lambda: index.add("request number 17"), repeat=1) < 0.001
+    assert best_time(lambda: index.add("a brand new request"), repeat=1) < 0.001
+    assert best_time(lambda: index.complete("")) < 0.001
+    assert best_time(lambda: index.complete("request number 1")) < 0.001
+
+    assert index.complete("")[:2] == ["request number 17", "a brand new request"]
+    assert index.complete("request number 1")[0] == "request number 17"
+    assert index.complete("a brand") == ["a brand new request"]
+
+def test_cached_completions_match_a_full_ranking(tmp_path):
+    history_file = tmp_path / "history.log"
+    history_file.write_text("".join(f"entry {i % 700} {i % 3}\n" for i in range(3000)))
+    index = CompletionIndex(history_file)
+    index.refresh()
+    for i in range(0, 700, 7):
+        index.add(f"entry {i} new")
+
+    for prefix in ("", "e", "entry ", "entry 1", "entry 6"):
+        expected = sorted((entry for entry in index._stats if entry.startswith(prefix)),
+                          key=index._score, reverse=True)[:10]
+        assert index.complete(prefix) == expected
+
+def test_refresh_after_history_is_truncated(tmp_path):
+    history_file = tmp_path / "history.log"
+    history_file.write_text("list files\nlist folders\n")
+    index = CompletionIndex(history_file, patterns=["count lines"])
+    index.refresh()
+
+    history_file.write_text("")
+    index.refresh()
+
+    assert index.complete("") == ["count lines"]
+
+def test_install_completer_lists_ranked_suggestions(tmp_path, capsys):
+    history_file = tmp_path / "history.log"
+    history_file.write_text("list folders\nlist files\nlist files\n")
+    index = CompletionIndex(history_file)
+    fake_readline = MagicMock(__doc__="GNU readline")
+    fake_readline.get_line_buffer.return_value = "list f"
+
+    with patch('nlba.completion.readline', fake_readline):
+        assert install_completer(index)
+        completer = fake_readline.set_completer.call_args.args[0]
+        display_suggestions = fake_readline.set_completion_display_matches_hook.call_args.args[0]
+
+        assert [completer("list f", state) for state in range(3)] == ["list files", "list folders", None]
+        display_suggestions("list f", ["list folders", "list files"], 12)
+    assert capsys.readouterr().out == "\n  list files\n  list folders\n> list f"
+
+def test_install_completer_without_readline(tmp_path):
+    with patch('nlba.completion.readline', None):
+        assert not install_completer(CompletionIndex(tmp_path / "history.log"))
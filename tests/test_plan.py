@@ -0,0 +1,143 @@
+import io
+import threading
+import time
+import pytest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+from nlba.config_manager import load_journal
+from nlba.llm_interface import MockLLMProvider
+from nlba.nlba import run_nlba
+from nlba.plan import PlanStep, PlanExecutor, parse_plan, validate_plan
+from nlba.session import NLBASession
+
+
+class SleepingExecutor:
+    def __init__(self, delay=0.2, failing=()):
+        self.delay = delay
+        self.failing = failing
+        self.started = []
+        self._lock = threading.Lock()
+
+    def execute_command(self, command: str) -> tuple[str, str, int]:
+        with self._lock:
+            self.started.append(command)
+        time.sleep(self.delay)
+        if command in self.failing:
+            return "", "failed", 1
+        return f"output of {command}", "", 0
+
+
+def test_parse_plan():
+    steps = parse_plan('```json\n{"steps": [{"id": "a", "command": "ls"}, '
+                       '{"id": "b", "command": "rm x", "depends_on": ["a"], "destructive": true}]}\n```')
+
+    assert steps == [PlanStep("a", "ls"), PlanStep("b", "rm x", ["a"], True)]
+    assert steps[1].classification == "destructive"
+
+def test_parse_plan_accepts_a_single_dependency_without_a_list():
+    steps = parse_plan('{"steps": [{"id": "fetch", "command": "curl x"}, '
+                       '{"id": "count", "command": "wc -l", "depends_on": "fetch"}, '
+                       '{"id": 3, "command": "ls"}, {"id": 4, "command": "du", "depends_on": 3}]}')
+
+    assert steps[1].depends_on == ["fetch"]
+    assert steps[3].depends_on == ["3"]
+
+def test_parse_plan_rejects_invalid_plans():
+    with pytest.raises(ValueError):
+        parse_plan("ls -l")
+    with pytest.raises(ValueError):
+        parse_plan('{"steps": [{"id": "a", "command": "ls", "depends_on": ["missing"]}]}')
+    with pytest.raises(ValueError):
+        validate_plan([PlanStep("a", "ls", ["b"]), PlanStep("b", "ls", ["a"])])
+
+def test_independent_steps_run_concurrently():
+    executor = SleepingExecutor(delay=0.2)
+    steps = [PlanStep("1", "a"), PlanStep("2", "b"), PlanStep("3", "c"), PlanStep("4", "d", ["1", "2", "3"])]
+
+    start = time.perf_counter()
+    results = list(PlanExecutor(executor, max_workers=4).run(steps))
+    elapsed = time.perf_counter() - start
+
+    assert [result.step.id for result in results][-1] == "4"
+    assert all(result.succeeded for result in results)
+    # Critical path is two steps long, not four.
+    assert elapsed < 0.6
+
+def test_steps_after_a_failure_are_skipped():
+    executor = SleepingExecutor(delay=0, failing=("b",))
+    steps = [PlanStep("1", "a"), PlanStep("2", "b"), PlanStep("3", "c", ["2"]), PlanStep("4", "d", ["3"])]
+
+    results = {result.step.id: result for result in PlanExecutor(executor).run(steps)}
+
+    assert results["1"].succeeded
+    assert results["2"].exit_code == 1
+    assert results["3"].skipped and results["4"].skipped
+    assert executor.started == ["a", "b"] or executor.started == ["b", "a"]
+
+def test_mock_provider_generates_plan():
+    steps = MockLLMProvider().generate_plan("list files and remove file x then show date")
+
+    assert [step.command for step in steps[:2]] == ["ls -l", "rm test_file.txt"]
+    assert steps[1].destructive
+    assert steps[2].depends_on == ["1", "2"]
+
+@patch('nlba.session.log_request')
+@patch('builtins.input', return_value='y')
+def test_run_nlba_plan_mode(mock_input, mock_log_request):
+    f = io.StringIO()
+    with patch('nlba.nlba.CommandExecutor', new=lambda: SleepingExecutor(delay=0)):
+        with redirect_stdout(f):
+            run_nlba("list files and show date", provider="mock", config={}, plan=True, summarize=True)
+    output = f.getvalue()
+
+    assert "Generated plan:" in output
+    mock_input.assert_called_once_with("Execute this plan? (y/N): ")
+    assert "--- Step 1: ls -l" in output
+    assert "--- Step 2: echo 'Mock command for: show date'" in output
+    assert "[1] This is a mock summary for the command: 'ls -l'" in output
+    assert load_journal() == [{'request': "list files and show date",
+                               'command': "ls -l; echo 'Mock command for: show date'", 'exit_code': 0}]
+
+@patch('nlba.session.log_request')
+def test_failed_plan_is_journaled_with_the_failing_exit_code(mock_log_request):
+    session = NLBASession("mock", config={}, executor=SleepingExecutor(delay=0, failing=("b",)))
+    steps = [PlanStep("1", "a"), PlanStep("2", "b"), PlanStep("3", "c", ["2"])]
+
+    session.record_plan_outcome("do things", list(session.execute_plan(steps)))
+
+    assert load_journal()[0]['exit_code'] == 1
+
+def test_run_rejects_unknown_dependencies():
+    with pytest.raises(ValueError):
+        list(PlanExecutor(SleepingExecutor(delay=0)).run([PlanStep("1", "true", ["missing"])]))
+
+def test_skipped_step_unblocks_dependents_listed_before_it():
+    executor = SleepingExecutor(delay=0, failing=("a",))
+    steps = [PlanStep("3", "c", ["2"]), PlanStep("2", "b", ["1"]), PlanStep("1", "a")]
+
+    results = {result.step.id: result for result in PlanExecutor(executor).run(steps)}
+
+    assert results["2"].skipped and results["3"].skipped
+
+def test_malformed_plan_falls_back_to_single_command():
+    from nlba.llm_interface import OpenAILLMProvider
+    from unittest.mock import MagicMock
+    provider = OpenAILLMProvider.__new__(OpenAILLMProvider)
+    provider.model_name = "gpt-3.5-turbo"
+    provider.client = MagicMock()
+    provider.client.chat.completions.create.return_value.choices[0].message.content = '{"steps": [oops'
+
+    with patch.object(OpenAILLMProvider, 'generate_command', return_value=("ls -l", "non-destructive")):
+        steps = provider.generate_plan("list files")
+
+    assert steps == [PlanStep("1", "ls -l")]
+
+@patch('builtins.input', return_value='y')
+def test_run_nlba_plan_mode_reports_invalid_plan(mock_input):
+    f = io.StringIO()
+    with patch.object(MockLLMProvider, 'generate_plan', return_value=[PlanStep("1", "true", ["missing"])]):
+        with redirect_stdout(f):
+            run_nlba("anything", provider="mock", config={}, plan=True)
+
+    assert "Could not generate a valid plan" in f.getvalue()
+    mock_input.assert_not_called()
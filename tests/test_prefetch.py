@@ -0,0 +1,79 @@
+import pytest
+from unittest.mock import patch
+from nlba.llm_interface import MockLLMProvider
+from nlba.prefetch import RequestPredictor, Prefetcher
+
+
+def make_predictor(requests):
+    predictor = RequestPredictor()
+    for request in requests:
+        predictor.observe(request)
+    return predictor
+
+def test_predictor_learns_sequences():
+    predictor = make_predictor(["git status", "show diff", "build", "run tests", "git status", "show diff", "git status", "list files"])
+
+    assert predictor.predict(k=2, after="git status") == ["show diff", "list files"]
+    assert predictor.predict(k=1, after="build") == ["run tests"]
+    assert predictor.predict(k=1, after="never seen") == []
+
+def test_predictor_prefers_longer_context():
+    predictor = make_predictor(["a", "b", "c", "x", "b", "d", "x", "b", "d"])
+
+    assert predictor.predict(k=2, after="b") == ["d", "c"]
+    predictor.observe("a")
+    assert predictor.predict(k=2, after="b") == ["c", "d"]
+
+def test_predictor_loads_history(tmp_path):
+    history_file = tmp_path / "history.log"
+    history_file.write_text("build\nrun tests\n")
+    predictor = RequestPredictor()
+    predictor.load_history(history_file)
+
+    assert predictor.predict(k=1, after="build") == ["run tests"]
+
+def test_prefetched_request_is_served_from_cache():
+    provider = MockLLMProvider()
+    prefetcher = Prefetcher(provider, make_predictor(["build", "list files"]))
+
+    with patch.object(MockLLMProvider, 'generate_command', wraps=provider.generate_command) as mock_generate:
+        prefetcher.prefetch(after="build")
+        prefetcher._pool.shutdown(wait=True)
+        assert prefetcher.generate_command("list files") == ("ls -l", "non-destructive")
+        assert prefetcher.generate_command("create directory x") == ("mkdir new_dir", "destructive")
+
+    assert mock_generate.call_count == 2
+    assert prefetcher.metrics == {'hits': 1, 'misses': 1, 'speculative_calls': 1, 'rate_limited': 0, 'hit_rate': 0.5}
+
+def test_prefetch_respects_budget():
+    prefetcher = Prefetcher(MockLLMProvider(), make_predictor(["build", "list files", "build", "run tests"]), top_k=2, budget=1)
+
+    prefetcher.prefetch(after="build")
+    prefetcher.prefetch(after="build")
+    prefetcher.close()
+
+    assert prefetcher.metrics['speculative_calls'] == 1
+
+def test_speculative_calls_do_not_queue_behind_the_rate_limit(tmp_path):
+    from nlba.rate_limiter import RateLimiter
+
+    class LimitedProvider(MockLLMProvider):
+        def generate_command(self, natural_language_request):
+            self._wait_for_capacity(natural_language_request)
+            return super().generate_command(natural_language_request)
+
+    provider = LimitedProvider()
+    provider.rate_limiter = RateLimiter("gemini/test", requests_per_minute=1, db_file=tmp_path / "limits.db")
+    provider.generate_command("build")  # uses the only request of this minute
+    prefetcher = Prefetcher(provider, make_predictor(["build", "list files"]))
+
+    with patch('nlba.rate_limiter.time.sleep') as mock_sleep:
+        prefetcher.prefetch(after="build")
+        prefetcher._pool.shutdown(wait=True)
+        prefetcher.generate_command("list files")
+
+    assert prefetcher.metrics['rate_limited'] == 1
+    assert prefetcher.metrics['hits'] == 0
+    # Only the real request waited; the failed speculative call took no quota.
+    mock_sleep.assert_called_once()
+    assert mock_sleep.call_args[0][0] == pytest.approx(60, abs=1)
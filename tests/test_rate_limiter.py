@@ -0,0 +1,88 @@
+import pytest
+from unittest.mock import patch
+from nlba.rate_limiter import RateLimiter, get_rate_limiter
+
+
+def test_requests_beyond_quota_are_queued(tmp_path):
+    limiter = RateLimiter("gemini/test", requests_per_minute=60, db_file=tmp_path / "limits.db")
+
+    with patch('nlba.rate_limiter.time.time', return_value=1000.0):
+        waits = [limiter._reserve(0) for _ in range(62)]
+
+    assert waits[:60] == [0.0] * 60
+    # Each queued request gets the next free slot instead of retrying.
+    assert waits[60] == pytest.approx(1.0)
+    assert waits[61] == pytest.approx(2.0)
+
+def test_budget_is_shared_between_limiter_instances(tmp_path):
+    db_file = tmp_path / "limits.db"
+    first = RateLimiter("openai/test", tokens_per_minute=600, db_file=db_file)
+    second = RateLimiter("openai/test", tokens_per_minute=600, db_file=db_file)
+    other_model = RateLimiter("openai/other", tokens_per_minute=600, db_file=db_file)
+
+    with patch('nlba.rate_limiter.time.time', return_value=1000.0):
+        assert first._reserve(500) == 0.0
+        assert second._reserve(200) == pytest.approx(10.0)
+        assert other_model._reserve(200) == 0.0
+
+def test_bucket_refills_over_time(tmp_path):
+    limiter = RateLimiter("gemini/test", requests_per_minute=60, db_file=tmp_path / "limits.db")
+
+    with patch('nlba.rate_limiter.time.time', return_value=1000.0):
+        for _ in range(60):
+            limiter._reserve(0)
+    with patch('nlba.rate_limiter.time.time', return_value=1005.0):
+        assert [limiter._reserve(0) for _ in range(5)] == [0.0] * 5
+        assert limiter._reserve(0) == pytest.approx(1.0)
+
+def test_try_acquire_never_takes_quota_it_cannot_use(tmp_path):
+    limiter = RateLimiter("gemini/test", requests_per_minute=2, db_file=tmp_path / "limits.db")
+
+    with patch('nlba.rate_limiter.time.time', return_value=1000.0):
+        assert limiter.try_acquire()
+        assert limiter.try_acquire()
+        assert not limiter.try_acquire()
+        # The refused call left no debt behind for real requests.
+    with patch('nlba.rate_limiter.time.time', return_value=1030.0):
+        assert limiter._reserve(0) == 0.0
+
+def test_acquire_records_wait_metrics(tmp_path):
+    limiter = RateLimiter("gemini/test", requests_per_minute=60, db_file=tmp_path / "limits.db")
+
+    with patch.object(RateLimiter, '_reserve', side_effect=[0.0, 0.5]), \
+         patch('nlba.rate_limiter.time.sleep') as mock_sleep:
+        limiter.acquire()
+        limiter.acquire()
+
+    mock_sleep.assert_called_once_with(0.5)
+    assert limiter.metrics == {'calls': 2, 'queued_calls': 1, 'total_wait': 0.5, 'max_wait': 0.5}
+
+def test_get_rate_limiter_from_config():
+    config = {'rate_limits': {'gemini': {'gemini-1.5-flash': {'requests_per_minute': 15}}}}
+
+    limiter = get_rate_limiter(config, 'gemini', 'gemini-1.5-flash')
+
+    assert limiter.key == 'gemini/gemini-1.5-flash'
+    assert limiter.requests_per_minute == 15
+    assert limiter.tokens_per_minute is None
+    assert get_rate_limiter(config, 'openai', 'gpt-3.5-turbo') is None
+    assert get_rate_limiter({'nlba': {'provider': 'mock'}}, 'gemini', 'gemini-1.5-flash') is None
+
+def test_session_reports_rate_limit_metrics(tmp_path):
+    import io
+    from contextlib import redirect_stdout
+    from nlba.llm_interface import MockLLMProvider
+    from nlba.nlba import print_rate_limit_metrics
+    from nlba.session import NLBASession
+
+    provider = MockLLMProvider()
+    provider.rate_limiter = RateLimiter("gemini/test", requests_per_minute=60, db_file=tmp_path / "limits.db")
+    session = NLBASession(config={}, llm_provider=provider)
+    provider.rate_limiter.acquire(10)
+
+    f = io.StringIO()
+    with redirect_stdout(f):
+        print_rate_limit_metrics(session)
+
+    assert session.rate_limit_metrics["gemini/test"]['calls'] == 1
+    assert "gemini/test: 1 calls, 0 queued, 0.00s total wait" in f.getvalue()
@@ -0,0 +1,125 @@
+from unittest.mock import patch
+from nlba.llm_interface import BaseLLMProvider, speculative_calls
+from nlba.router import RequestRouter, RoutingLLMProvider
+from nlba.session import NLBASession, ExecutionResult, create_llm_provider
+
+
+class RecordingProvider(BaseLLMProvider):
+    def __init__(self, name, command=None, error=None):
+        self.name = name
+        self.command = command if command is not None else f"{name} command"
+        self.error = error
+        self.requests = []
+
+    def generate_command(self, natural_language_request: str) -> tuple[str, str]:
+        self.requests.append(natural_language_request)
+        if self.error:
+            raise self.error
+        return self.command, "non-destructive"
+
+    def summarize_output(self, request: str, command: str, output: str) -> str:
+        return f"{self.name} summary"
+
+
+def test_simple_requests_score_low():
+    router = RequestRouter(journal=[])
+
+    assert router.route("list files") == "fast"
+    assert router.score("list files") == 0
+
+def test_complex_requests_score_high():
+    router = RequestRouter(journal=[])
+    request = "find every log file recursively, grep each for errors and then sort by count"
+
+    assert router.score(request) >= 3
+    assert router.route(request) == "strong"
+
+def test_past_failures_raise_the_score():
+    journal = [
+        {'request': 'show disk usage of home', 'exit_code': 1},
+        {'request': 'show disk usage of home folder', 'exit_code': 2},
+        {'request': 'list files', 'exit_code': 0},
+    ]
+    router = RequestRouter(journal=journal)
+
+    assert router.failure_rate("show disk usage of home") == 1.0
+    assert router.failure_rate("list files") == 0.0
+    assert router.route("show disk usage of home") == "strong"
+
+def test_routing_provider_uses_fast_and_strong_models():
+    fast, strong = RecordingProvider("fast"), RecordingProvider("strong")
+    provider = RoutingLLMProvider(fast, strong, RequestRouter(journal=[]))
+
+    assert provider.generate_command("list files") == ("fast command", "non-destructive")
+    assert provider.generate_command("find every file recursively then sort it") == ("strong command", "non-destructive")
+    assert provider.summarize_output("list files", "ls", "") == "fast summary"
+
+    metrics = provider.metrics
+    assert metrics['fast']['calls'] == 2
+    assert metrics['strong']['calls'] == 1
+    assert metrics['escalations'] == 0
+
+def test_routing_provider_escalates_fast_failures():
+    strong = RecordingProvider("strong")
+    for fast in (RecordingProvider("fast", command=""), RecordingProvider("fast", error=RuntimeError("timeout"))):
+        provider = RoutingLLMProvider(fast, strong, RequestRouter(journal=[]))
+
+        assert provider.generate_command("list files") == ("strong command", "non-destructive")
+        assert provider.metrics['escalations'] == 1
+
+def test_speculative_calls_are_left_out_of_route_metrics():
+    provider = RoutingLLMProvider(RecordingProvider("fast", command=""), RecordingProvider("strong"), RequestRouter(journal=[]))
+
+    with speculative_calls():
+        assert provider.generate_command("list files") == ("strong command", "non-destructive")
+
+    assert provider.metrics == {
+        'escalations': 0,
+        'fast': {'calls': 0, 'total_latency': 0.0, 'average_latency': 0.0},
+        'strong': {'calls': 0, 'total_latency': 0.0, 'average_latency': 0.0},
+    }
+
+@patch('nlba.session.log_outcome')
+def test_session_outcomes_update_the_router(mock_log_outcome):
+    provider = RoutingLLMProvider(RecordingProvider("fast"), RecordingProvider("strong"), RequestRouter(journal=[]))
+    session = NLBASession(llm_provider=provider, config={})
+    request = "show disk usage of home"
+    assert provider.router.route(request) == "fast"
+
+    session.record_outcome(request, ExecutionResult("du ~", "", "denied", 1, 0.0))
+
+    assert provider.router.failure_rate(request) == 1.0
+    assert provider.router.route(request) == "strong"
+    mock_log_outcome.assert_called_once_with(request, "du ~", 1)
+
+def test_create_llm_provider_from_routing_config():
+    class FakeGeminiProvider(RecordingProvider):
+        def __init__(self, model, rate_limiter=None):
+            super().__init__(model)
+
+    config = {'routing': {'gemini': {'fast': 'gemini-1.5-flash', 'strong': 'gemini-1.5-pro', 'threshold': 3}}}
+    with patch('nlba.session.GeminiLLMProvider', new=FakeGeminiProvider), \
+         patch('nlba.router.load_journal', return_value=[]):
+        provider = create_llm_provider("gemini", config)
+        unrouted = create_llm_provider("gemini", {})
+
+    assert isinstance(provider, RoutingLLMProvider)
+    assert (provider.fast.name, provider.strong.name) == ('gemini-1.5-flash', 'gemini-1.5-pro')
+    assert provider.router.threshold == 3
+    assert unrouted.name == 'gemini-1.5-flash'
+
+def test_run_nlba_reports_routing_metrics():
+    import io
+    from contextlib import redirect_stdout
+    from nlba.nlba import run_nlba
+    provider = RoutingLLMProvider(RecordingProvider("fast", command="true"), RecordingProvider("strong"), RequestRouter(journal=[]))
+
+    f = io.StringIO()
+    with patch('nlba.session.create_llm_provider', return_value=provider), patch('nlba.session.log_request'):
+        with redirect_stdout(f):
+            run_nlba("list files", provider="gemini", skip_confirmation=True, config={})
+    output = f.getvalue()
+
+    assert "--- Model Routing ---" in output
+    assert "fast: 1 calls" in output
+    assert "escalations: 0" in output
@@ -0,0 +1,128 @@
+import asyncio
+import threading
+from unittest.mock import patch
+from nlba.session import NLBASession, GenerationResult
+
+
+class MockCommandExecutor:
+    def __init__(self):
+        self.commands = []
+
+    def execute_command(self, command: str) -> tuple[str, str, int]:
+        self.commands.append(command)
+        return "total 0", "", 0
+
+
+def make_session(**kwargs):
+    return NLBASession("mock", config={'nlba': {'provider': 'mock'}}, executor=MockCommandExecutor(), **kwargs)
+
+@patch('nlba.session.log_request')
+def test_run_returns_typed_results(mock_log_request):
+    session = make_session()
+
+    result = session.run("list files", summarize=True)
+
+    assert result.generation.command == "ls -l"
+    assert not result.generation.destructive
+    assert result.execution.stdout == "total 0"
+    assert result.execution.exit_code == 0
+    assert result.summary.summary == "This is a mock summary for the command: 'ls -l'"
+    assert set(result.timings) == {'generate', 'execute', 'summarize'}
+    mock_log_request.assert_called_once_with("list files")
+
+@patch('nlba.session.log_request')
+def test_run_cancelled_by_confirm(mock_log_request):
+    session = make_session()
+    seen = []
+
+    def confirm(generation):
+        seen.append(generation)
+        return False
+
+    result = session.run("remove file test_file.txt", confirm=confirm)
+
+    assert result.cancelled
+    assert seen == [result.generation]
+    assert result.generation.destructive
+    assert session.executor.commands == []
+    mock_log_request.assert_not_called()
+
+def test_session_reuses_provider_and_executor():
+    with patch('nlba.session.create_llm_provider') as mock_create, patch('nlba.session.log_request'):
+        mock_create.return_value.generate_command.return_value = ("ls -l", "non-destructive")
+        session = make_session()
+        session.run("list files")
+        session.run("list files again")
+
+    mock_create.assert_called_once()
+    assert session.executor.commands == ["ls -l", "ls -l"]
+
+def test_summarize_default_comes_from_config():
+    session = NLBASession("mock", config={'nlba': {'summarize': True}}, executor=MockCommandExecutor())
+
+    with patch('nlba.session.log_request'):
+        assert session.run("list files").summary is not None
+        assert session.run("list files", summarize=False).summary is None
+
+def test_async_variants():
+    session = make_session()
+
+    async def scenario():
+        generation = await session.agenerate("list files")
+        execution = await session.aexecute(generation.command)
+        return generation, execution
+
+    generation, execution = asyncio.run(scenario())
+
+    assert isinstance(generation, GenerationResult)
+    assert execution.stdout == "total 0"
+
+def test_concurrent_summaries_share_one_provider_call():
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from nlba.llm_interface import MockLLMProvider
+    session = NLBASession("mock", config={'nlba': {'summary_batch_wait': 0.2}}, executor=MockCommandExecutor())
+    summarize_output = session.llm_provider.summarize_output
+    first_started = threading.Event()
+
+    def slow_summarize_output(*args):
+        first_started.set()
+        time.sleep(0.1)
+        return summarize_output(*args)
+
+    def summarize(i):
+        if i:
+            first_started.wait()
+        return session.summarize("request", f"cmd {i}", "output")
+
+    with patch.object(MockLLMProvider, 'summarize_output', side_effect=slow_summarize_output), \
+         patch.object(MockLLMProvider, 'summarize_outputs', wraps=session.llm_provider.summarize_outputs) as mock_batched:
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            results = list(pool.map(summarize, range(3)))
+    session.close()
+
+    assert [result.summary for result in results] == [f"This is a mock summary for the command: 'cmd {i}'" for i in range(3)]
+    # The first summary is sent directly; the two that arrive while it is in flight are batched.
+    mock_batched.assert_called_once()
+    assert len(mock_batched.call_args.args[0]) == 2
+
+def test_lone_and_closed_summaries_skip_the_batcher():
+    session = make_session()
+
+    assert session.summarize("request", "ls", "output").summary
+    session.close()
+    threads = threading.active_count()
+    assert session.summarize("request", "ls", "output").summary
+
+    assert session._summary_batcher is None
+    assert threading.active_count() == threads
+
+def test_run_records_outcome_in_journal(isolate_journal):
+    from nlba.config_manager import load_journal
+    session = make_session()
+
+    with patch('nlba.session.log_request'):
+        session.run("list files")
+
+    assert isolate_journal.exists()
+    assert load_journal() == [{'request': 'list files', 'command': 'ls -l', 'exit_code': 0}]
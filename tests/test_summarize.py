@@ -59,3 +59,68 @@ def test_summarize_output_gemini_provider(mock_input, mock_gemini_generate_comma
     assert "--- Summary ---" in output
     assert 'The command `ls -l` executed successfully, showing an empty directory.' in output
     mock_gemini_summarize_output.assert_called_once_with("list files", "ls -l", "total 0")
+
+def test_summarize_outputs_mock_provider_batches_items():
+    from nlba.llm_interface import MockLLMProvider
+    provider = MockLLMProvider()
+    items = [("list files", "ls -l", "total 0"), ("show date", "date", "Mon Jan 1")]
+
+    with patch.object(MockLLMProvider, 'summarize_output', wraps=provider.summarize_output) as mock_summarize:
+        summaries = provider.summarize_outputs(items)
+
+    assert summaries == [
+        "This is a mock summary for the command: 'ls -l'",
+        "This is a mock summary for the command: 'date'",
+    ]
+    assert mock_summarize.call_count == 2  # the mock builds its batched response from per-item summaries
+
+def test_summarize_outputs_falls_back_when_batch_unparseable():
+    from nlba.llm_interface import MockLLMProvider
+    provider = MockLLMProvider()
+    items = [("list files", "ls -l", "total 0"), ("show date", "date", "Mon Jan 1")]
+
+    with patch.object(MockLLMProvider, '_summarize_batch', side_effect=ValueError("bad response")) as mock_batch:
+        summaries = provider.summarize_outputs(items)
+
+    mock_batch.assert_called_once()
+    assert summaries[1] == "This is a mock summary for the command: 'date'"
+
+def test_split_into_batches_respects_token_budget():
+    from nlba.llm_interface import split_into_batches
+    items = [("request", "cmd", "x" * 400) for _ in range(5)]
+
+    batches = split_into_batches(items, token_budget=350)
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert split_into_batches([("request", "cmd", "x" * 4000)], token_budget=350) == [[("request", "cmd", "x" * 4000)]]
+
+def test_parse_batch_summaries():
+    from nlba.llm_interface import parse_batch_summaries
+    assert parse_batch_summaries("SUMMARY 2: second\nsummary 1: first\n", 2) == ["first", "second"]
+    with pytest.raises(ValueError):
+        parse_batch_summaries("SUMMARY 1: first", 2)
+
+def test_summary_batcher_collects_items_into_one_call():
+    from nlba.llm_interface import MockLLMProvider
+    from nlba.summary_batcher import SummaryBatcher
+    provider = MockLLMProvider()
+
+    with patch.object(MockLLMProvider, 'summarize_outputs', wraps=provider.summarize_outputs) as mock_summarize:
+        with SummaryBatcher(provider, max_wait=0.5) as batcher:
+            futures = [batcher.submit("request", f"cmd {i}", "output") for i in range(3)]
+        summaries = [future.result(timeout=1) for future in futures]
+
+    assert summaries == [f"This is a mock summary for the command: 'cmd {i}'" for i in range(3)]
+    mock_summarize.assert_called_once()
+
+def test_summary_batcher_fails_items_without_summary():
+    from nlba.llm_interface import MockLLMProvider
+    from nlba.summary_batcher import SummaryBatcher
+
+    with patch.object(MockLLMProvider, 'summarize_outputs', return_value=["only one"]):
+        with SummaryBatcher(MockLLMProvider(), max_wait=0.5) as batcher:
+            futures = [batcher.submit("request", f"cmd {i}", "output") for i in range(2)]
+
+    assert futures[0].result(timeout=1) == "only one"
+    with pytest.raises(RuntimeError):
+        futures[1].result(timeout=1)
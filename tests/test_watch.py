@@ -0,0 +1,96 @@
+import io
+from contextlib import redirect_stdout
+from unittest.mock import patch
+from nlba.config_manager import load_journal
+from nlba.nlba import handle_watch
+from nlba.session import NLBASession
+from nlba.watch import LineChange, OutputWatcher, diff_lines
+
+
+class SequenceExecutor:
+    def __init__(self, outputs):
+        self.outputs = list(outputs)
+
+    def execute_command(self, command: str) -> tuple[str, str, int]:
+        output = self.outputs.pop(0)
+        return output if isinstance(output, tuple) else (output, "", 0)
+
+
+def test_diff_lines_reports_only_changes():
+    previous = ["header", "a 1", "b 2", "c 3", "footer"]
+    current = ["header", "a 1", "b 5", "c 3", "d 4", "footer"]
+
+    assert diff_lines(previous, current) == [
+        LineChange('-', 3, "b 2"),
+        LineChange('+', 3, "b 5"),
+        LineChange('+', 5, "d 4"),
+    ]
+    assert diff_lines(current, list(current)) == []
+
+def test_diff_lines_handles_removals_at_the_edges():
+    assert diff_lines(["a", "b", "c"], ["b", "c"]) == [LineChange('-', 1, "a")]
+    assert diff_lines(["a", "b"], ["a", "b", "c"]) == [LineChange('+', 3, "c")]
+    assert diff_lines(["a"], []) == [LineChange('-', 1, "a")]
+
+def test_output_watcher_tracks_previous_output():
+    watcher = OutputWatcher()
+
+    assert watcher.update("a\nb") == [LineChange('+', 1, "a"), LineChange('+', 2, "b")]
+    assert watcher.update("a\nb") == []
+    changes = watcher.update("a\nc")
+    assert changes == [LineChange('-', 2, "b"), LineChange('+', 2, "c")]
+    assert watcher.change_ratio(changes) == 0.5
+
+def test_change_ratio_counts_a_modified_line_once():
+    watcher = OutputWatcher()
+    lines = [f"line {i}" for i in range(10)]
+    watcher.update("\n".join(lines))
+    lines[4] = "line 4 changed"
+
+    changes = watcher.update("\n".join(lines))
+    assert len(changes) == 2
+    assert watcher.change_ratio(changes) == 0.1
+    assert watcher.change_ratio(watcher.update("\n".join(lines[:5]))) == 0.5
+
+@patch('nlba.nlba.time.sleep')
+@patch('nlba.session.log_request')
+def test_handle_watch_prints_only_changes(mock_log_request, mock_sleep):
+    executor = SequenceExecutor(["conn 1\nconn 2", "conn 1\nconn 2", "conn 1\nconn 3"])
+    session = NLBASession("mock", config={'nlba': {'watch_summary_threshold': 0.5}}, executor=executor)
+
+    f = io.StringIO()
+    with redirect_stdout(f):
+        handle_watch(session, "count connections", 2, skip_confirmation=True, summarize=True, max_runs=3)
+    output = f.getvalue()
+
+    assert output.count("changed lines") == 2
+    assert output.count("+ 1: conn 1") == 1
+    assert "- 2: conn 2" in output
+    assert "+ 2: conn 3" in output
+    assert output.count("--- Summary ---") == 1
+    assert mock_sleep.call_count == 2
+
+@patch('nlba.nlba.time.sleep')
+@patch('nlba.session.log_request')
+def test_handle_watch_prints_stderr_when_it_changes(mock_log_request, mock_sleep):
+    executor = SequenceExecutor([
+        ("up", "", 0),
+        ("up", "warning: slow", 0),
+        ("up", "warning: slow", 0),
+        ("", "error: unreachable", 1),
+    ])
+    session = NLBASession("mock", config={}, executor=executor)
+
+    f = io.StringIO()
+    with redirect_stdout(f):
+        handle_watch(session, "check service", 1, skip_confirmation=True, summarize=False, max_runs=4)
+    output = f.getvalue()
+
+    assert output.count("changed lines") == 3
+    assert output.count("STDERR:") == 2
+    assert output.count("warning: slow") == 1
+    assert "error: unreachable" in output
+    assert "(exit code 1)" in output
+    assert load_journal() == [
+        {'request': "check service", 'command': "echo 'Mock command for: check service'", 'exit_code': 0}
+    ]